@@ -0,0 +1,71 @@
+# Time to first token and total latency of the chatbot's plain and RAG paths
+# against the local mock inference server, next to the blocking (non-streamed)
+# RAG answer the chatbot used to wait for.
+#
+#   python benchmarks/bench_chat_latency.py --requests 20 --ttft 0.3 --token-delay 0.02
+#
+# The RAG corpus is a throwaway one built with the hashing embedding backend.
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_inference_server import serve
+
+QUESTIONS = [
+    "Where are the evacuation shelters?",
+    "How do I evacuate with pets?",
+    "What number do I call for road closures?",
+    "How do I apply for FEMA assistance?",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    server = serve(0, args.ttft, args.token_delay)
+    os.environ["LLM_BASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ["EMBEDDING_BACKEND"] = "hashing"
+    os.environ["DRP_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench-chat-")
+
+    from utils.corpus import get_corpus
+    from utils.llm import GENERATION_PARAMS, LLM_MODEL, get_inference_client, get_latency_stats, stream_chat
+    from utils.rag import get_rag_chain
+
+    chunks = [{"text": f"{question} See section {i} of the county guide.", "metadata": {"page": i}}
+              for i, question in enumerate(QUESTIONS * 25)]
+    get_corpus().add_document("guide", "County guide", "bench", chunks)
+
+    chain = get_rag_chain()
+    blocking = []
+    for i in range(args.requests):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        list(stream_chat([{"role": "user", "content": question}]))
+        _, tokens = chain.stream(question)
+        list(tokens)
+
+        start = time.perf_counter()
+        messages = chain.messages(question, chain.retrieve(question))
+        get_inference_client().chat.completions.create(model=LLM_MODEL, messages=messages, **GENERATION_PARAMS)
+        blocking.append(time.perf_counter() - start)
+
+    print(f"{'path':>14} {'ttft p50':>9} {'ttft p95':>9} {'total p50':>10} {'total p95':>10}")
+    for kind, stats in get_latency_stats().summary().items():
+        print(f"{kind:>14} {stats['ttft_p50']:>8.3f}s {stats['ttft_p95']:>8.3f}s "
+              f"{stats['total_p50']:>9.3f}s {stats['total_p95']:>9.3f}s")
+    blocking.sort()
+    p50, p95 = blocking[len(blocking) // 2], blocking[int(len(blocking) * 0.95) - 1]
+    print(f"{'rag, blocking':>14} {p50:>8.3f}s {p95:>8.3f}s {p50:>9.3f}s {p95:>9.3f}s")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
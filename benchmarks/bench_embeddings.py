@@ -0,0 +1,74 @@
+# Chunks per second for each embedding backend, uncached, on the chunks of a
+# PDF or on synthetic relief-manual chunks.
+#
+#   python benchmarks/bench_embeddings.py --backends hashing local hub
+#   python benchmarks/bench_embeddings.py --pdf manual.pdf --threads 4
+#
+# "hub" needs HF_TOKEN; "local" needs sentence-transformers. A backend that
+# cannot be created is reported and skipped.
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.embeddings import BACKENDS, CachedEmbeddings
+
+WORDS = (
+    "evacuation shelter county emergency wildfire smoke air quality water supply "
+    "red cross fema assistance form application deadline insurance claim debris "
+    "road closure hotline phone volunteer donation medical supplies pets livestock"
+).split()
+
+
+def synthetic_chunks(count, words=180, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(words)) for _ in range(count)]
+
+
+def pdf_chunks(path):
+    from pypdf import PdfReader
+
+    text = "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+    return [text[start:start + 1000] for start in range(0, len(text), 900)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["hashing", "local", "hub"], choices=sorted(BACKENDS))
+    parser.add_argument("--pdf")
+    parser.add_argument("--chunks", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--cached", action="store_true", help="also time a second, cached pass")
+    args = parser.parse_args()
+
+    chunks = pdf_chunks(args.pdf) if args.pdf else synthetic_chunks(args.chunks)
+    print(f"{len(chunks)} chunks, batch size {args.batch_size}, {args.threads} threads")
+    for name in args.backends:
+        options = {} if name == "hashing" else {"batch_size": args.batch_size, "threads": args.threads}
+        try:
+            backend = BACKENDS[name](**options)
+            # Warm up model loading and connections outside the timing
+            backend.embed(chunks[:2])
+        except Exception as e:
+            print(f"{name:>8}: skipped ({type(e).__name__}: {e})")
+            continue
+        start = time.perf_counter()
+        vectors = backend.embed(chunks)
+        seconds = time.perf_counter() - start
+        print(f"{name:>8}: {len(chunks) / seconds:10,.1f} chunks/s  ({vectors.shape[1]} dims, {backend.model})")
+
+        if args.cached:
+            cached = CachedEmbeddings(backend)
+            cached.embed(chunks)
+            start = time.perf_counter()
+            cached.embed(chunks)
+            seconds = time.perf_counter() - start
+            print(f"{'cached':>8}: {len(chunks) / seconds:10,.1f} chunks/s")
+
+
+if __name__ == "__main__":
+    main()
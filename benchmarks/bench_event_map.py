@@ -0,0 +1,62 @@
+# Compare map payload size and build time for the marker and cluster render modes.
+#
+#   python benchmarks/bench_event_map.py [--sizes 100 1000 10000]
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import folium
+
+from utils.events import build_event_table
+from utils.maps import plot_disaster_events
+
+GEOJSON_FILEPATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "result.geojson")
+
+
+# Scatter copies of the recorded GDACS features around the globe
+def synthetic_features(template, count, seed=0):
+    rng = random.Random(seed)
+    features = []
+    for i in range(count):
+        feature = copy.deepcopy(template[i % len(template)])
+        lon, lat = rng.uniform(-180, 180), rng.uniform(-60, 70)
+        feature["geometry"] = {"type": "Point", "coordinates": [lon, lat]}
+        feature["bbox"] = [lon, lat, lon, lat]
+        feature["properties"]["eventname"] = f"{feature['properties']['eventname']}-{i}"
+        features.append(feature)
+    return features
+
+
+def build(events, features, mode):
+    start = time.perf_counter()
+    m = folium.Map(location=[20.0, 0.0], zoom_start=2)
+    plot_disaster_events(m, events, features, mode=mode)
+    payload = m.get_root().render()
+    return time.perf_counter() - start, len(payload.encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    with open(GEOJSON_FILEPATH, "r") as f:
+        template = json.load(f)["features"]
+
+    print(f"{'events':>8} {'mode':>8} {'build (s)':>10} {'payload (KB)':>13}")
+    for size in args.sizes:
+        features = synthetic_features(template, size)
+        events = build_event_table(features)
+        for mode in ("markers", "cluster"):
+            seconds, size_bytes = build(events, features, mode)
+            print(f"{size:>8} {mode:>8} {seconds:>10.3f} {size_bytes / 1024:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
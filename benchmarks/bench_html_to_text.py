@@ -0,0 +1,68 @@
+# Time of utils.text.html_to_text against the old `re.sub("<.*?>", "", text)`
+# cleaner on synthetic article markup of growing size.
+#
+#   python benchmarks/bench_html_to_text.py --sizes 10000 100000 1000000
+#
+# "tags" is well-formed markup; "unclosed" is text with many "<" and no ">",
+# which makes the non-greedy regex rescan to the end of the input from every
+# "<" (quadratic), while the tokenizer stays linear.
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.text import html_to_text, html_to_text_batch
+
+ARTICLE = (
+    '<div class="story"><h2>Wildfire update</h2><p>Crews &amp; volunteers are containing the '
+    '<b>Palisades</b> fire near <a href="https://example.com/?utm_source=x">Malibu</a>.</p>'
+    "<script>track('view');</script><style>.story{color:red}</style>"
+    "<ul><li>Evacuations lifted</li><li>Air quality &lt;poor&gt;</li></ul></div> "
+)
+UNCLOSED = "temperature < 40 and wind < 20 mph; "
+
+
+def old_clean_html(text):
+    clean = re.compile("<.*?>")
+    return re.sub(clean, "", text)
+
+
+def markup(kind, size):
+    unit = ARTICLE if kind == "tags" else UNCLOSED
+    return (unit * (size // len(unit) + 1))[:size] + " … [+1234 chars]"
+
+
+def timed(fn, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch", type=int, default=1000, help="articles in the batch timing")
+    args = parser.parse_args()
+
+    print(f"{'input':>10} {'chars':>10} {'regex ms':>10} {'text ms':>10}")
+    for kind in ("tags", "unclosed"):
+        for size in args.sizes:
+            text = markup(kind, size)
+            regex = timed(old_clean_html, text, args.repeat)
+            parsed = timed(html_to_text, text, args.repeat)
+            print(f"{kind:>10} {size:>10,} {regex * 1000:>10.1f} {parsed * 1000:>10.1f}")
+
+    batch = [ARTICLE + " … [+1234 chars]"] * args.batch
+    start = time.perf_counter()
+    html_to_text_batch(batch)
+    seconds = time.perf_counter() - start
+    print(f"batch of {args.batch} articles: {args.batch / seconds:,.0f} articles/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Throughput of the local keyword backend and its overlap with recorded
+# Watson NLU keywords.
+#
+#   python benchmarks/bench_keywords.py                                # committed corpus, no credentials
+#   python benchmarks/bench_keywords.py --record recorded_nlu.jsonl   # needs NEWS_API_KEY and NLU credentials
+#   python benchmarks/bench_keywords.py recorded_nlu.jsonl
+#
+# Each line of a recording is {"title": ..., "text": ..., "keywords": [...], "seconds": ...}.
+# The committed corpus in data/keywords_corpus.jsonl holds short wildfire news
+# texts with reference keywords in NLU's output shape; it has no "seconds", so
+# only the local throughput and the overlap are reported for it.
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.keywords import rake_keywords
+
+LIMIT = 5
+
+DEFAULT_RECORDING = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "keywords_corpus.jsonl")
+
+
+def record(path, queries):
+    from utils.feeds import load_news
+    from utils.nlu import extract_keywords
+
+    with open(path, "w") as f:
+        for query in queries:
+            for article in load_news(query):
+                text = article.get("content") or article.get("description")
+                if not text:
+                    continue
+                start = time.perf_counter()
+                keywords = extract_keywords(text, limit=LIMIT)
+                seconds = time.perf_counter() - start
+                f.write(json.dumps({
+                    "title": article.get("title"), "text": text, "keywords": keywords, "seconds": seconds,
+                }) + "\n")
+
+
+def _words(phrases):
+    return {word for phrase in phrases for word in phrase.lower().split()}
+
+
+def compare(path, repeat):
+    with open(path, "r") as f:
+        recorded = [json.loads(line) for line in f if line.strip()]
+    if not recorded:
+        sys.exit(f"{path} has no recorded articles")
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        local = [rake_keywords(item["text"], LIMIT) for item in recorded]
+    local_seconds = (time.perf_counter() - start) / repeat
+    nlu_seconds = sum(item.get("seconds", 0.0) for item in recorded)
+
+    exact = word_overlap = 0.0
+    for item, keywords in zip(recorded, local):
+        expected = {keyword.lower() for keyword in item["keywords"]}
+        exact += len(expected & {keyword.lower() for keyword in keywords}) / max(len(expected), 1)
+        expected_words = _words(item["keywords"])
+        word_overlap += len(expected_words & _words(keywords)) / max(len(expected_words), 1)
+
+    print(f"articles:                 {len(recorded)}")
+    print(f"local throughput:         {len(recorded) / local_seconds:,.0f} articles/s")
+    if nlu_seconds:
+        print(f"recorded NLU throughput:  {len(recorded) / nlu_seconds:,.1f} articles/s (sequential)")
+    print(f"keyword recall vs NLU:    {exact / len(recorded):.1%} exact, {word_overlap / len(recorded):.1%} by word")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("recording", nargs="?", default=DEFAULT_RECORDING)
+    parser.add_argument("--record", action="store_true", help="fetch news and record NLU keywords first")
+    parser.add_argument("--queries", nargs="+", default=["LA Wild Fires", "California fires"])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.recording, args.queries)
+    compare(args.recording, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Recall@k and latency of dense, BM25, fused and fused + reranked retrieval
+# on a fixed question set over generated county guidance: hotline numbers,
+# shelters and form IDs, the lookups pure dense search tends to miss.
+#
+#   python benchmarks/bench_retrieval.py                         # hashing embeddings
+#   python benchmarks/bench_retrieval.py --embeddings local --reranker cross-encoder
+#
+# Runs on a throwaway corpus under a temporary cache directory.
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COUNTIES = [
+    "Alameda", "Alpine", "Amador", "Butte", "Calaveras", "Colusa", "Contra Costa", "Del Norte", "El Dorado",
+    "Fresno", "Glenn", "Humboldt", "Imperial", "Inyo", "Kern", "Kings", "Lake", "Lassen", "Los Angeles",
+    "Madera", "Marin", "Mariposa", "Mendocino", "Merced", "Modoc", "Mono", "Monterey", "Napa", "Nevada",
+    "Orange", "Placer", "Plumas", "Riverside", "Sacramento", "San Benito", "San Bernardino", "San Diego",
+]
+GUIDANCE = [
+    "Keep a go-bag with water, medication, copies of documents and chargers ready by the door.",
+    "Wildfire smoke can reach unhealthy levels far from the fire; stay indoors and use an air purifier.",
+    "Leave early when an evacuation warning is issued and follow the routes posted by local authorities.",
+    "Pets should travel in carriers with food, water and vaccination records for shelter check-in.",
+    "Photograph every room of your home before returning so insurance claims can be documented.",
+    "After the fire, wear an N95 mask and gloves while sorting through ash and debris.",
+]
+FACILITIES = ["High School gym", "Community Center", "Fairgrounds hall", "Veterans Memorial Building"]
+
+
+def build_corpus(seed=0):
+    rng = random.Random(seed)
+    chunks, questions = [], []
+    for county in COUNTIES:
+        phone = f"{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}"
+        form = f"{county[:2].upper()}-{rng.randint(100, 999)}"
+        shelter = f"{county} {rng.choice(FACILITIES)}"
+        facts = {
+            "hotline": f"{county} County emergency hotline: call {phone} for evacuation updates and road closures.",
+            "shelter": f"The evacuation shelter for {county} County is at the {shelter}; bring ID and medication.",
+            "form": f"Request debris removal in {county} County by submitting form {form} to the county office.",
+        }
+        for fact in facts.values():
+            chunks.append(fact + " " + rng.choice(GUIDANCE))
+        base = len(chunks) - 3
+        questions += [
+            (f"What number do I call in {county} County?", base),
+            (f"Where is the evacuation shelter in {county}?", base + 1),
+            (f"Which form do I submit for debris removal in {county} County?", base + 2),
+            (f"What is form {form} for?", base + 2),
+            (f"Who answers the {phone} hotline?", base),
+        ]
+    for i in range(200):
+        chunks.append(" ".join(rng.sample(GUIDANCE, 3)))
+    return chunks, questions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embeddings", default="hashing")
+    parser.add_argument("--reranker", default="lexical")
+    parser.add_argument("--ks", type=int, nargs="+", default=[1, 3, 5])
+    args = parser.parse_args()
+
+    os.environ["EMBEDDING_BACKEND"] = args.embeddings
+    os.environ["DRP_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench-retrieval-")
+
+    from utils.corpus import get_corpus
+    from utils.retrieval import HybridRetriever
+
+    texts, questions = build_corpus()
+    corpus = get_corpus()
+    corpus.add_document("guide", "County guide", "bench", [{"text": text, "metadata": {}} for text in texts])
+    retriever = HybridRetriever(corpus, reranker=args.reranker)
+    retriever.sync()
+    ids = sorted(corpus.chunk_ids())
+    expected = {question: ids[position] for question, position in questions}
+
+    k_max = max(args.ks)
+    methods = {
+        "dense": lambda q: retriever.dense(q, k_max),
+        "bm25": lambda q: retriever.sparse(q, k_max),
+        "rrf": lambda q: retriever.retrieve(q, k_max, rerank=False),
+        "rrf + rerank": lambda q: retriever.retrieve(q, k_max),
+    }
+    print(f"{len(texts)} chunks, {len(questions)} questions, {args.embeddings} embeddings, {args.reranker} reranker")
+    print(f"{'method':>13} " + " ".join(f"{f'recall@{k}':>9}" for k in args.ks) + f" {'p50 ms':>8} {'p95 ms':>8}")
+    for name, method in methods.items():
+        hits = {k: 0 for k in args.ks}
+        latencies = []
+        for question, _ in questions:
+            start = time.perf_counter()
+            ranked = [chunk["id"] for chunk in method(question)]
+            latencies.append((time.perf_counter() - start) * 1000)
+            for k in args.ks:
+                hits[k] += expected[question] in ranked[:k]
+        latencies.sort()
+        p50, p95 = latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95) - 1]
+        recalls = " ".join(f"{hits[k] / len(questions):>9.1%}" for k in args.ks)
+        print(f"{name:>13} {recalls} {p50:>8.2f} {p95:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
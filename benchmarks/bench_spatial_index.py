@@ -0,0 +1,64 @@
+# Build and query times for the SOS spatial index against a NumPy brute-force scan.
+#
+#   python benchmarks/bench_spatial_index.py [--sizes 1000 10000 100000] [--queries 200]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from utils.spatial import SpatialIndex, haversine_km
+
+# Bounding box roughly covering California, where the SOS app is used
+CA_BOUNDS = (32.5, -124.4, 42.0, -114.1)
+
+
+def random_points(count, rng):
+    south, west, north, east = CA_BOUNDS
+    return rng.uniform(south, north, count), rng.uniform(west, east, count)
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    for query in queries:
+        fn(*query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    print(f"{'points':>8} {'build (ms)':>11} {'bbox':>8} {'r=5km':>8} {'knn=5':>8} {'scan r=5km':>11}  (ms/query)")
+    for size in args.sizes:
+        lats, lons = random_points(size, rng)
+        index = SpatialIndex()
+        start = time.perf_counter()
+        index.add_many(range(size), lats, lons)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        q_lats, q_lons = random_points(args.queries, rng)
+        boxes = [(lat - 0.05, lon - 0.05, lat + 0.05, lon + 0.05) for lat, lon in zip(q_lats, q_lons)]
+        points = list(zip(q_lats, q_lons))
+
+        bbox_ms = timed(index.bbox, boxes)
+        radius_ms = timed(lambda lat, lon: index.radius(lat, lon, 5), points)
+        knn_ms = timed(lambda lat, lon: index.nearest(lat, lon, 5), points)
+        scan_ms = timed(lambda lat, lon: np.flatnonzero(haversine_km(lat, lon, lats, lons) <= 5), points)
+
+        # The index must agree with the brute-force scan
+        lat, lon = points[0]
+        expected = set(np.flatnonzero(haversine_km(lat, lon, lats, lons) <= 5).tolist())
+        assert {key for key, _ in index.radius(lat, lon, 5)} == expected
+
+        print(f"{size:>8} {build_ms:>11.1f} {bbox_ms:>8.3f} {radius_ms:>8.3f} {knn_ms:>8.3f} {scan_ms:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# OpenAI-compatible chat completions server with a fixed time to first token
+# and inter-token delay, for measuring the chatbot's own overhead without a
+# real model.
+#
+#   python benchmarks/mock_inference_server.py --port 8080 --ttft 0.3 --token-delay 0.02
+#   LLM_BASE_URL=http://127.0.0.1:8080 streamlit run app.py
+#
+# Streaming requests get server-sent events, others a single JSON body.
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = (
+    "Go to the nearest open evacuation shelter listed by your county, bring water, medication, "
+    "documents and supplies for pets, and follow the routes given by local authorities."
+)
+
+
+def make_handler(ttft, token_delay, answer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _event(self, payload):
+            data = f"data: {payload}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            model = request.get("model") or "mock"
+            words = answer.split(" ")[:request.get("max_tokens") or None]
+            time.sleep(ttft)
+            if not request.get("stream"):
+                time.sleep(token_delay * len(words))
+                self._send_json({
+                    "id": "mock", "object": "chat.completion", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": " ".join(words)}}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": len(words), "total_tokens": len(words)},
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i, word in enumerate(words):
+                if i:
+                    time.sleep(token_delay)
+                self._event(json.dumps({
+                    "id": "mock", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "finish_reason": None,
+                                 "delta": {"role": "assistant", "content": word if i == 0 else " " + word}}],
+                }))
+            self._event("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+# Start the server on a daemon thread and return it; port 0 picks a free port
+def serve(port=0, ttft=0.3, token_delay=0.02, answer=ANSWER):
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(ttft, token_delay, answer))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--ttft", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between tokens")
+    args = parser.parse_args()
+
+    server = serve(args.port, args.ttft, args.token_delay)
+    print(f"mock inference server on http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# Caches and stores created by the code under test go to a throwaway directory
+os.environ.setdefault("DRP_CACHE_DIR", tempfile.mkdtemp(prefix="drp-tests-"))
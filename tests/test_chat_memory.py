@@ -0,0 +1,85 @@
+import pytest
+
+from utils import chat_memory
+from utils.chat_memory import CHAT_TOKEN_BUDGET, RECENT_MESSAGES, ConversationMemory, message_tokens
+
+SYSTEM = {"role": "system", "content": "You are a disaster relief assistant."}
+
+
+# One token per word, so budgets in the tests can be checked by hand
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    monkeypatch.setattr(chat_memory, "count_tokens", lambda text: len(text.split()))
+    message_tokens.cache_clear()
+    yield
+    message_tokens.cache_clear()
+
+
+def prompt_tokens(messages):
+    return sum(len(message["content"].split()) + chat_memory.MESSAGE_OVERHEAD for message in messages)
+
+
+def conversation(turns, words=150):
+    messages = [SYSTEM]
+    for turn in range(turns):
+        messages.append({"role": "user", "content": " ".join([f"question{turn}"] * words)})
+        messages.append({"role": "assistant", "content": " ".join([f"answer{turn}"] * words)})
+    return messages
+
+
+class StubSummarizer:
+    def __init__(self, words=20):
+        self.words = words
+        self.calls = []
+
+    def __call__(self, summary, messages):
+        self.calls.append(len(messages))
+        return " ".join(["summary"] * self.words)
+
+
+def test_prompt_stays_within_budget_and_keeps_recent_messages():
+    summarizer = StubSummarizer()
+    memory = ConversationMemory(summarizer=summarizer)
+
+    for turns in range(1, 31):
+        messages = conversation(turns)
+        prompt = memory.prompt(messages)
+
+        assert prompt_tokens(prompt) <= CHAT_TOKEN_BUDGET
+        assert prompt[-RECENT_MESSAGES:] == messages[-RECENT_MESSAGES:]
+
+    assert summarizer.calls
+    assert "Summary of the earlier conversation: summary" in prompt[0]["content"]
+    # Folding goes down to the low watermark, so each summary covers more
+    # than the single message that pushed the prompt over budget
+    assert all(count >= 2 for count in summarizer.calls)
+    assert len(summarizer.calls) < 30
+
+
+def test_long_summary_is_cut_to_the_budget():
+    memory = ConversationMemory(summarizer=StubSummarizer(words=5 * CHAT_TOKEN_BUDGET))
+
+    prompt = memory.prompt(conversation(20))
+
+    assert prompt_tokens(prompt) <= CHAT_TOKEN_BUDGET
+    assert memory.summary
+    assert prompt[-RECENT_MESSAGES:] == conversation(20)[-RECENT_MESSAGES:]
+
+
+def test_failing_summarizer_drops_old_turns_without_growing_the_prompt():
+    def failing(summary, messages):
+        raise RuntimeError("inference endpoint down")
+
+    memory = ConversationMemory(summarizer=failing)
+    sizes = []
+    for turns in range(1, 31):
+        messages = conversation(turns)
+        prompt = memory.prompt(messages)
+        sizes.append(prompt_tokens(prompt))
+
+        assert prompt[0] == SYSTEM
+        assert prompt[-RECENT_MESSAGES:] == messages[-RECENT_MESSAGES:]
+
+    assert max(sizes) <= CHAT_TOKEN_BUDGET
+    assert memory.summary == ""
+    assert memory.folded > 0
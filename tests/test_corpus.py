@@ -0,0 +1,97 @@
+import faiss
+import pytest
+
+from utils import corpus as corpus_module
+from utils.corpus import Corpus, read_index
+from utils.embeddings import HashingEmbeddingBackend
+
+TOPICS = ["evacuation shelter", "road closure", "air quality", "water supply", "power outage", "pet rescue"]
+
+
+def chunks(*texts):
+    return [{"text": text, "metadata": {"page": i}} for i, text in enumerate(texts)]
+
+
+def numbered_chunks(doc, count):
+    return chunks(*(f"{doc} note {i} about {TOPICS[i % len(TOPICS)]} in zone z{i}" for i in range(count)))
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    return Corpus(str(tmp_path / "corpus"), HashingEmbeddingBackend())
+
+
+def test_add_and_query(corpus):
+    result = corpus.add_document("guide", "County guide", "h1", chunks(
+        "The evacuation shelter is at Pasadena High School.",
+        "Road closures on Highway 2 until Friday.",
+    ))
+
+    assert result == {"added": 2, "kept": 0, "removed": 0}
+    assert [(doc["doc_id"], doc["chunks"]) for doc in corpus.documents()] == [("guide", 2)]
+    chunk, _ = corpus.query("where is the evacuation shelter", k=1)[0]
+    assert chunk["text"] == "The evacuation shelter is at Pasadena High School."
+    assert chunk["name"] == "County guide"
+    assert chunk["metadata"] == {"page": 0}
+
+
+def test_update_keeps_unchanged_chunks(corpus):
+    corpus.add_document("guide", "County guide", "h1", chunks("alpha shelter", "beta closure", "gamma water"))
+    before = {chunk["text"]: chunk["id"] for chunk in corpus.chunks(corpus.chunk_ids())}
+
+    result = corpus.add_document("guide", "County guide", "h2", chunks("beta closure", "alpha shelter", "delta power"))
+
+    assert result == {"added": 1, "kept": 2, "removed": 1}
+    after = {chunk["text"]: chunk for chunk in corpus.chunks(corpus.chunk_ids())}
+    assert set(after) == {"alpha shelter", "beta closure", "delta power"}
+    # Kept chunks keep their id and take their new position
+    assert after["alpha shelter"]["id"] == before["alpha shelter"]
+    assert after["alpha shelter"]["metadata"] == {"page": 1}
+
+    # Same content hash again: nothing is staged or embedded
+    assert corpus.add_document("guide", "County guide", "h2", chunks("ignored")) == {"added": 0, "kept": 3, "removed": 0}
+
+
+def test_replaces_other_documents_and_removes(corpus):
+    corpus.add_document("guide:v1", "guide.pdf", "h1", chunks("alpha shelter", "beta closure"))
+    corpus.add_document("other", "other.pdf", "h3", chunks("epsilon rescue"))
+
+    result = corpus.add_document("guide:v2", "guide.pdf", "h2", chunks("alpha shelter", "zeta supply"), replaces=["guide:v1"])
+
+    assert result == {"added": 1, "kept": 1, "removed": 1}
+    assert sorted(doc["doc_id"] for doc in corpus.documents()) == ["guide:v2", "other"]
+
+    assert corpus.remove_document("guide:v2") == 2
+    assert [doc["doc_id"] for doc in corpus.documents()] == ["other"]
+    assert {chunk["doc_id"] for chunk, _ in corpus.query("alpha shelter", k=5)} == {"other"}
+
+
+def test_doc_ids_filter(corpus):
+    corpus.add_document("a", "a.pdf", "ha", chunks("evacuation shelter at the school", "water supply notice"))
+    corpus.add_document("b", "b.pdf", "hb", chunks("evacuation shelter at the library"))
+
+    hits = corpus.query("evacuation shelter", k=5, doc_ids=["b"])
+
+    assert [chunk["text"] for chunk, _ in hits] == ["evacuation shelter at the library"]
+    assert corpus.query("evacuation shelter", k=5, doc_ids=["missing"]) == []
+    assert {chunk["doc_id"] for chunk, _ in corpus.query("evacuation shelter", k=5)} == {"a", "b"}
+
+
+def test_index_switches_between_flat_and_ivf(corpus, monkeypatch):
+    monkeypatch.setattr(corpus_module, "IVF_MIN_VECTORS", 64)
+
+    corpus.add_document("big", "big.pdf", "h1", numbered_chunks("big", 80))
+    assert isinstance(read_index(corpus.index_path), faiss.IndexIVF)
+
+    # Shrinking a little keeps the trained lists
+    corpus.add_document("big", "big.pdf", "h2", numbered_chunks("big", 40))
+    assert isinstance(read_index(corpus.index_path), faiss.IndexIVF)
+
+    # Well below the threshold the index is rebuilt flat
+    corpus.add_document("big", "big.pdf", "h3", numbered_chunks("big", 20))
+    index = read_index(corpus.index_path)
+    assert not isinstance(index, faiss.IndexIVF)
+    assert index.ntotal == 20
+    expected = numbered_chunks("big", 20)[3]["text"]
+    chunk, _ = corpus.query(expected, k=1)[0]
+    assert chunk["text"] == expected
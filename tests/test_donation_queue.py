@@ -0,0 +1,96 @@
+import sqlite3
+
+import pytest
+from ibm_cloud_sdk_core import ApiException
+
+from utils.donation_queue import build_donation, enqueue_donation, flush_queue, pending_count
+
+
+class FakeResult:
+    def __init__(self, result):
+        self.result = result
+
+    def get_result(self):
+        return self.result
+
+
+# Stand-in for post_bulk_docs that answers each document id from `outcomes`
+# (default "ok"), or raises `error` for the whole request
+class FakeBulkDocs:
+    def __init__(self, outcomes=None, error=None):
+        self.outcomes = outcomes or {}
+        self.error = error
+        self.batches = []
+
+    def post_bulk_docs(self, db, bulk_docs):
+        ids = [doc.to_dict()["_id"] for doc in bulk_docs.docs]
+        self.batches.append(ids)
+        if self.error:
+            raise self.error
+        results = []
+        for doc_id in ids:
+            outcome = self.outcomes.get(doc_id, "ok")
+            if outcome == "ok":
+                results.append({"id": doc_id, "ok": True, "rev": "1-a"})
+            else:
+                results.append({"id": doc_id, "error": outcome, "reason": f"{outcome} reason"})
+        return FakeResult(results)
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return str(tmp_path / "queue.sqlite3")
+
+
+def queue_donations(path, count):
+    return [enqueue_donation(build_donation(f"Donor {i}", f"donor{i}@example.com", i + 1), path=path) for i in range(count)]
+
+
+def attempts(path):
+    with sqlite3.connect(path) as conn:
+        return dict(conn.execute("SELECT id, attempts || ':' || IFNULL(last_error, '') FROM pending"))
+
+
+def test_flushes_in_batches_and_treats_conflicts_as_delivered(queue):
+    ids = queue_donations(queue, 5)
+    client = FakeBulkDocs(outcomes={ids[1]: "conflict"})
+
+    result = flush_queue(client, "donations", batch_size=2, path=queue)
+
+    assert result == {"sent": 5, "failed": 0, "pending": 0}
+    assert client.batches == [ids[0:2], ids[2:4], ids[4:5]]
+    assert pending_count(path=queue) == 0
+
+
+def test_partial_batch_keeps_rejected_documents(queue):
+    ids = queue_donations(queue, 4)
+    client = FakeBulkDocs(outcomes={ids[1]: "forbidden"})
+
+    result = flush_queue(client, "donations", batch_size=2, path=queue)
+
+    # The first batch had a rejection, so the flush stops there
+    assert result == {"sent": 1, "failed": 1, "pending": 3}
+    assert attempts(queue)[ids[1]] == "1:forbidden: forbidden reason"
+    assert attempts(queue)[ids[2]] == "0:"
+
+    result = flush_queue(FakeBulkDocs(), "donations", batch_size=2, path=queue)
+    assert result == {"sent": 3, "failed": 0, "pending": 0}
+
+
+@pytest.mark.parametrize("error", [
+    ApiException(503, message="Service Unavailable"),
+    ConnectionError("connection reset"),
+])
+def test_failed_request_counts_an_attempt_for_the_whole_batch(queue, error):
+    ids = queue_donations(queue, 3)
+    client = FakeBulkDocs(error=error)
+
+    with pytest.raises(type(error)):
+        flush_queue(client, "donations", batch_size=2, path=queue)
+    with pytest.raises(type(error)):
+        flush_queue(client, "donations", batch_size=2, path=queue)
+
+    recorded = attempts(queue)
+    assert pending_count(path=queue) == 3
+    assert [recorded[doc_id].split(":", 1)[0] for doc_id in ids] == ["2", "2", "0"]
+    assert str(error) in recorded[ids[0]]
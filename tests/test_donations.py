@@ -0,0 +1,193 @@
+import pytest
+
+from utils.donations import DonationAggregate, format_usd, iter_donations, sync_aggregate, top_donations
+
+
+class FakeResult:
+    def __init__(self, result):
+        self.result = result
+
+    def get_result(self):
+        return self.result
+
+
+# Minimal stand-in for a CouchDB-compatible _all_docs endpoint: rows sorted by
+# id, start_key inclusive, at most `limit` rows per request
+class FakeCloudant:
+    def __init__(self, docs):
+        self.docs = {doc["_id"]: doc for doc in docs}
+        self.requests = []
+
+    def post_all_docs(self, db, include_docs=False, limit=None, start_key=None):
+        self.requests.append({"db": db, "limit": limit, "start_key": start_key})
+        ids = sorted(doc_id for doc_id in self.docs if start_key is None or doc_id >= start_key)
+        rows = [{"id": doc_id, "key": doc_id} for doc_id in ids[:limit]]
+        if include_docs:
+            for row in rows:
+                row["doc"] = dict(self.docs[row["id"]])
+        return FakeResult({"total_rows": len(self.docs), "rows": rows})
+
+
+def donations(count):
+    return [
+        {"_id": f"donation-{i:03d}", "name": f"Donor {i}", "email": f"donor{i}@example.com", "amount": i}
+        for i in range(count)
+    ]
+
+
+def test_pages_with_start_key_and_reads_last_partial_page():
+    client = FakeCloudant(donations(7) + [{"_id": "_design/views", "views": {}}])
+
+    ids = [doc["_id"] for doc in iter_donations(client, "donations", page_size=3)]
+
+    # The design document sorts first: it fills a slot on the first page but is not yielded
+    assert ids == [f"donation-{i:03d}" for i in range(7)]
+    assert [request["start_key"] for request in client.requests] == [
+        None, "donation-002", "donation-005",
+    ]
+    assert all(request["limit"] == 4 for request in client.requests)
+
+
+def test_stops_after_exactly_full_last_page():
+    client = FakeCloudant(donations(6))
+
+    docs = list(iter_donations(client, "donations", page_size=3))
+
+    assert len(docs) == 6
+    assert len(client.requests) == 2
+
+
+def test_projects_fields():
+    client = FakeCloudant(donations(2))
+
+    docs = list(iter_donations(client, "donations", fields=("name", "amount")))
+
+    assert docs == [{"name": "Donor 0", "amount": 0}, {"name": "Donor 1", "amount": 1}]
+
+
+def test_top_donations_streams_largest_amounts():
+    docs = donations(450)
+    docs[10]["amount"] = "not a number"
+    client = FakeCloudant(docs)
+
+    top = top_donations(client, "donations", n=3)
+
+    assert [doc["amount"] for doc in top] == [449, 448, 447]
+    assert set(top[0]) == {"name", "amount", "created_at"}
+    assert len(client.requests) == 3
+
+
+# Minimal stand-in for the _changes feed: every write gets the next sequence
+# number and, as in CouchDB, only the latest change of each document is listed
+class FakeChanges:
+    def __init__(self):
+        self.seq = 0
+        self.log = {}
+        self.requests = []
+
+    def put(self, doc):
+        self.seq += 1
+        self.log[doc["_id"]] = {"seq": str(self.seq), "id": doc["_id"], "doc": dict(doc)}
+
+    def delete(self, doc_id):
+        self.seq += 1
+        self.log[doc_id] = {"seq": str(self.seq), "id": doc_id, "deleted": True, "doc": {"_id": doc_id, "_deleted": True}}
+
+    def post_changes(self, db, since="0", include_docs=False, limit=None):
+        self.requests.append({"db": db, "since": since, "limit": limit})
+        changes = sorted(
+            (change for change in self.log.values() if int(change["seq"]) > int(since)),
+            key=lambda change: int(change["seq"])
+        )
+        page = changes[:limit]
+        results = [
+            change if include_docs else {key: value for key, value in change.items() if key != "doc"}
+            for change in page
+        ]
+        last_seq = page[-1]["seq"] if page else since
+        return FakeResult({"results": results, "last_seq": last_seq, "pending": len(changes) - len(page)})
+
+
+def donation(doc_id, name, amount, day="2026-10-01"):
+    return {"_id": doc_id, "name": name, "amount": amount, "created_at": f"{day}T12:00:00Z"}
+
+
+@pytest.fixture
+def aggregate_path(tmp_path):
+    return str(tmp_path / "aggregate.sqlite3")
+
+
+def test_sync_applies_inserts_and_skips_design_docs(aggregate_path):
+    changes = FakeChanges()
+    changes.put(donation("d1", "Ada", 10))
+    changes.put(donation("d2", "Grace", "25.5", day="2026-10-02"))
+    changes.put({"_id": "_design/views", "views": {}})
+    changes.put({"_id": "d3", "name": "No amount"})
+    aggregate = DonationAggregate(aggregate_path)
+
+    assert sync_aggregate(changes, "donations", aggregate) == 4
+
+    assert aggregate.summary() == {
+        "total": 35.5,
+        "count": 2,
+        "top_donor": {"name": "Grace", "amount": 25.5},
+        "by_day": {"2026-10-01": 10.0, "2026-10-02": 25.5},
+    }
+    assert aggregate.since == "4"
+
+
+def test_edits_and_deletions_replace_earlier_contributions(aggregate_path):
+    changes = FakeChanges()
+    changes.put(donation("d1", "Ada", 10))
+    changes.put(donation("d2", "Grace", 20))
+    aggregate = DonationAggregate(aggregate_path)
+    sync_aggregate(changes, "donations", aggregate)
+
+    changes.put(donation("d1", "Ada", 40, day="2026-10-03"))
+    changes.delete("d2")
+    sync_aggregate(changes, "donations", aggregate)
+
+    assert aggregate.total == 40.0
+    assert aggregate.count == 1
+    assert aggregate.by_donor == {"Ada": 40.0}
+    assert aggregate.by_day == {"2026-10-03": 40.0}
+
+
+def test_pages_through_pending_changes(aggregate_path):
+    changes = FakeChanges()
+    for i in range(7):
+        changes.put(donation(f"d{i}", f"Donor {i}", i + 1))
+    aggregate = DonationAggregate(aggregate_path)
+
+    assert sync_aggregate(changes, "donations", aggregate, batch_size=3) == 7
+
+    assert [request["since"] for request in changes.requests] == ["0", "3", "6"]
+    assert all(request["limit"] == 3 for request in changes.requests)
+    assert aggregate.total == 28.0
+    assert aggregate.since == "7"
+
+
+def test_reloads_totals_and_checkpoint_from_sqlite(aggregate_path):
+    changes = FakeChanges()
+    changes.put(donation("d1", "Ada", 10))
+    changes.put(donation("d2", "Grace", 5))
+    sync_aggregate(changes, "donations", DonationAggregate(aggregate_path))
+
+    reloaded = DonationAggregate(aggregate_path)
+    assert reloaded.summary()["total"] == 15.0
+    assert reloaded.count == 2
+    assert reloaded.since == "2"
+
+    # Only changes after the stored checkpoint are requested, and an edit made
+    # before the reload is still subtracted correctly
+    changes.put(donation("d2", "Grace", 50))
+    assert sync_aggregate(changes, "donations", reloaded) == 1
+    assert changes.requests[-1]["since"] == "2"
+    assert reloaded.total == 60.0
+    assert reloaded.top_donor == {"name": "Grace", "amount": 50.0}
+
+
+def test_format_usd():
+    assert format_usd(35.0) == "$35.00"
+    assert format_usd("1234.5") == "$1,234.50"
+    assert format_usd(None) == "$0.00"
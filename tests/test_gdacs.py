@@ -0,0 +1,54 @@
+import json
+import os
+
+import pytest
+
+from utils.gdacs import fetch_feed, read_meta
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "gdacs_feed.json")
+
+
+def test_fetches_feed_and_keeps_validators(tmp_path):
+    filepath = str(tmp_path / "result.geojson")
+
+    assert fetch_feed(filepath, fixture=FIXTURE) is True
+
+    with open(filepath) as f:
+        assert len(json.load(f)["features"]) == 3
+    meta = read_meta(filepath)
+    assert meta["etag"] == '"gdacs-fixture-1"'
+    assert meta["last_modified"] == "Sat, 17 Oct 2026 08:00:00 GMT"
+
+
+def test_matching_etag_is_not_modified(tmp_path):
+    filepath = str(tmp_path / "result.geojson")
+    fetch_feed(filepath, fixture=FIXTURE)
+    first_fetch = read_meta(filepath)["fetched_at"]
+    mtime = os.stat(filepath).st_mtime_ns
+
+    assert fetch_feed(filepath, fixture=FIXTURE) is False
+
+    assert os.stat(filepath).st_mtime_ns == mtime
+    meta = read_meta(filepath)
+    assert meta["etag"] == '"gdacs-fixture-1"'
+    assert meta["fetched_at"] >= first_fetch
+
+
+def test_payload_without_features_keeps_previous_copy(tmp_path):
+    filepath = str(tmp_path / "result.geojson")
+    fetch_feed(filepath, fixture=FIXTURE)
+    with open(filepath, "rb") as f:
+        previous = f.read()
+
+    broken = tmp_path / "broken.json"
+    broken.write_text(json.dumps({
+        "status": 200,
+        "headers": {"ETag": '"gdacs-fixture-2"'},
+        "body": {"error": "maintenance"},
+    }))
+    with pytest.raises(ValueError):
+        fetch_feed(filepath, fixture=str(broken))
+
+    with open(filepath, "rb") as f:
+        assert f.read() == previous
+    assert read_meta(filepath)["etag"] == '"gdacs-fixture-1"'
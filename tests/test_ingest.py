@@ -0,0 +1,88 @@
+import os
+import tempfile
+
+import pytest
+
+from utils.corpus import Corpus
+from utils.embeddings import HashingEmbeddingBackend
+from utils.ingest import document_id, get_ingest_pool, ingest_pdf
+
+PAGES = [
+    "Evacuation shelters are open at Pasadena High School and the Westwood community center.",
+    "Highway 2 is closed between La Canada and Angeles Crest until further notice.",
+    "Boil water advisory for Altadena residents until the utility lifts it.",
+]
+
+
+# Smallest valid PDF with one line of Helvetica text per page
+def make_pdf(pages):
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 10 Tf 40 760 Td ({text}) Tj ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >>"
+            b" /Contents %d 0 R >>" % (len(objects))
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(pages))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+@pytest.fixture
+def temp_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "tmp"
+    directory.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(directory))
+    return directory
+
+
+@pytest.fixture(scope="module", autouse=True)
+def ingest_pool():
+    yield
+    get_ingest_pool().shutdown()
+    get_ingest_pool.cache_clear()
+
+
+def test_ingests_every_page_and_skips_unchanged_content(tmp_path, temp_dir):
+    corpus = Corpus(str(tmp_path / "corpus"), HashingEmbeddingBackend())
+    data = make_pdf(PAGES)
+    doc_id = document_id("advisories.pdf", data)
+    progress = []
+
+    result = ingest_pdf(corpus, doc_id, "advisories.pdf", data, progress=lambda done, total: progress.append((done, total)))
+
+    assert result == {"added": 3, "kept": 0, "removed": 0}
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+    assert os.listdir(temp_dir) == []
+    chunk, _ = corpus.query("Highway 2 closed", k=1)[0]
+    assert chunk["text"] == PAGES[1]
+    assert chunk["metadata"] == {"source": "advisories.pdf", "page": 1}
+
+    progress.clear()
+    again = ingest_pdf(corpus, doc_id, "advisories.pdf", data, progress=lambda done, total: progress.append((done, total)))
+
+    assert again == {"added": 0, "kept": 3, "removed": 0}
+    assert progress == []
+    assert os.listdir(temp_dir) == []
+
+
+def test_temp_copy_is_removed_when_ingest_fails(tmp_path, temp_dir):
+    corpus = Corpus(str(tmp_path / "corpus"), HashingEmbeddingBackend())
+
+    with pytest.raises(Exception):
+        ingest_pdf(corpus, "broken", "broken.pdf", b"%PDF-1.4\nnot really a pdf")
+
+    assert os.listdir(temp_dir) == []
+    assert corpus.documents() == []
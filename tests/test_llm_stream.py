@@ -0,0 +1,63 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from mock_inference_server import ANSWER, serve
+
+from utils import llm
+from utils.llm import StreamTiming, get_inference_client, get_latency_stats, stream_chat
+from utils.rag import RagChain
+
+TTFT = 0.05
+
+
+class StubRetriever:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.calls = []
+
+    def retrieve(self, question, k, doc_ids=None):
+        self.calls.append((question, k, doc_ids))
+        return self.chunks[:k]
+
+
+# Real InferenceClient pointed at the mock server, with fresh latency stats
+@pytest.fixture
+def mock_server(monkeypatch):
+    server = serve(0, ttft=TTFT, token_delay=0.001)
+    monkeypatch.setattr(llm, "LLM_BASE_URL", f"http://127.0.0.1:{server.server_port}")
+    get_inference_client.cache_clear()
+    get_latency_stats.cache_clear()
+    yield server
+    server.shutdown()
+    server.server_close()
+    get_inference_client.cache_clear()
+    get_latency_stats.cache_clear()
+
+
+def test_streams_chat_and_rag_turns_and_records_latency(mock_server):
+    timing = StreamTiming()
+    tokens = list(stream_chat([{"role": "user", "content": "Where do I go?"}], timing=timing))
+
+    assert len(tokens) == len(ANSWER.split(" "))
+    assert "".join(tokens) == ANSWER
+    assert timing.ttft >= TTFT
+    assert timing.total >= timing.ttft
+
+    retriever = StubRetriever([{"text": "Shelter at Main St school."}, {"text": "Bring water."}])
+    chunks, stream = RagChain(retriever, k=2).stream("Where is the shelter?", doc_ids=["guide"])
+
+    assert retriever.calls == [("Where is the shelter?", 2, ["guide"])]
+    assert chunks == retriever.chunks
+    assert "".join(stream) == ANSWER
+
+    summary = get_latency_stats().summary()
+    assert set(summary) == {"chat", "rag"}
+    for stats in summary.values():
+        assert stats["requests"] == 1
+        assert set(stats) == {"requests", "ttft_p50", "ttft_p95", "total_p50", "total_p95"}
+        assert TTFT <= stats["ttft_p50"] == stats["ttft_p95"]
+        assert stats["ttft_p50"] <= stats["total_p50"] == stats["total_p95"]
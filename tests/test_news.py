@@ -0,0 +1,115 @@
+import pytest
+
+from utils.news import ArticleFeed, NewsApiError, NewsClient, canonical_url
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+        self.headers = {"Content-Type": "application/json"}
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        pass
+
+
+# Stand-in for a requests session in front of NewsAPI /v2/everything: serves
+# `articles` page by page and records which pages were requested
+class FakeSession:
+    def __init__(self, articles, failing_pages=()):
+        self.articles = articles
+        self.failing_pages = set(failing_pages)
+        self.pages = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        page, size = params["page"], params["pageSize"]
+        self.pages.append(page)
+        if page in self.failing_pages:
+            return FakeResponse({"status": "error", "code": "rateLimited", "message": "Too many requests"}, 429)
+        return FakeResponse({
+            "status": "ok",
+            "totalResults": len(self.articles),
+            "articles": self.articles[(page - 1) * size:page * size],
+        })
+
+
+def article(i, **fields):
+    return {"title": f"Story {i}: crews report progress on fire line {i * 7}", "url": f"https://news.example.com/{i}", **fields}
+
+
+def client_for(articles, page_size=3, **kwargs):
+    session = FakeSession(articles, **kwargs)
+    return NewsClient("key", session=session, page_size=page_size), session
+
+
+def test_fetches_pages_only_as_the_reader_asks():
+    client, session = client_for([article(i) for i in range(8)])
+    feed = ArticleFeed(client, "LA fires")
+
+    assert session.pages == []
+    assert [a["url"] for a in feed.head(2)] == ["https://news.example.com/0", "https://news.example.com/1"]
+    assert session.pages == [1]
+    assert len(feed.head(5)) == 5
+    assert session.pages == [1, 2]
+    assert len(feed.head(20)) == 8
+    assert session.pages == [1, 2, 3]
+
+
+def test_has_more_looks_one_article_ahead():
+    client, session = client_for([article(i) for i in range(6)])
+    feed = ArticleFeed(client, "LA fires")
+
+    assert feed.has_more(3)
+    assert session.pages == [1, 2]
+    assert feed.has_more(5)
+    assert not feed.has_more(6)
+    assert session.pages == [1, 2]
+    assert bool(feed)
+    assert not ArticleFeed(client_for([])[0], "nothing")
+
+
+def test_dedupes_by_canonical_url_and_similar_title():
+    articles = [
+        article(0),
+        article(1, url="https://www.news.example.com/0/?utm_source=feed"),
+        {"title": "Story 0: crews report progress on fire line 0 - Example News", "url": "https://other.example.org/a"},
+        article(2),
+    ]
+    client, _ = client_for(articles, page_size=10)
+
+    assert [a["url"] for a in ArticleFeed(client, "fires").head(10)] == [
+        "https://news.example.com/0", "https://news.example.com/2",
+    ]
+
+
+def test_first_page_seed_is_not_repeated():
+    articles = [article(i) for i in range(5)]
+    client, session = client_for(articles)
+    seed = [dict(articles[0], url="http://www.news.example.com/0?utm_medium=email")]
+
+    feed = ArticleFeed(client, "fires", first=seed)
+
+    assert feed.head(1) == seed
+    assert session.pages == []
+    assert [canonical_url(a["url"]) for a in feed.head(10)] == [
+        canonical_url(a["url"]) for a in articles
+    ]
+
+
+def test_failed_later_page_keeps_earlier_articles():
+    client, session = client_for([article(i) for i in range(9)], failing_pages={2})
+    feed = ArticleFeed(client, "fires")
+
+    assert len(feed.head(10)) == 3
+    assert not feed.has_more(3)
+    assert session.pages == [1, 2]
+
+
+def test_failed_first_page_raises():
+    client, _ = client_for([article(0)], failing_pages={1})
+
+    with pytest.raises(NewsApiError):
+        ArticleFeed(client, "fires").head(1)
@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+import requests
+from ibm_cloud_sdk_core import ApiException
+
+from utils import nlu
+from utils.nlu import NLU_BACKOFF_MAX, extract_keywords_batch
+from utils.nlu_cache import NluCache
+
+
+class FakeResult:
+    def __init__(self, result):
+        self.result = result
+
+    def get_result(self):
+        return self.result
+
+
+# Stand-in for the NLU analyze endpoint: keywords are the text's words, and
+# `script` maps a text to the errors to raise before answering
+class FakeNlu:
+    def __init__(self, script=None):
+        self.script = {text: list(errors) for text, errors in (script or {}).items()}
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def analyze(self, text, features):
+        with self._lock:
+            self.calls.append(text)
+            errors = self.script.get(text)
+            error = errors.pop(0) if errors else None
+        if error is not None:
+            raise error
+        limit = features.keywords.limit
+        return FakeResult({"keywords": [{"text": word} for word in text.split()[:limit]]})
+
+
+def rate_limited(retry_after):
+    response = requests.Response()
+    response.status_code = 429
+    response.headers["Retry-After"] = retry_after
+    response._content = b'{"error": "Too many requests", "code": 429}'
+    return ApiException(429, http_response=response)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    waits = []
+    monkeypatch.setattr(nlu.time, "sleep", waits.append)
+    return waits
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return NluCache(path=str(tmp_path / "nlu.sqlite3"))
+
+
+def test_results_follow_input_order(sleeps, cache):
+    texts = [f"text {i} words" for i in range(12)]
+    client = FakeNlu()
+
+    results = extract_keywords_batch(texts, limit=2, nlu=client, max_workers=4, cache=cache)
+
+    assert results == [["text", str(i)] for i in range(12)]
+    assert sorted(client.calls) == sorted(texts)
+
+
+def test_rate_limit_waits_for_retry_after(sleeps, cache):
+    client = FakeNlu({"wildfire smoke": [rate_limited("2"), rate_limited("1")]})
+
+    results = extract_keywords_batch(["wildfire smoke"], nlu=client, cache=cache)
+
+    assert results == [["wildfire", "smoke"]]
+    assert sleeps == [2.0, 1.0]
+    assert client.calls == ["wildfire smoke"] * 3
+
+
+def test_retry_after_is_capped(sleeps, cache):
+    client = FakeNlu({"evacuation order": [rate_limited("86400")]})
+
+    extract_keywords_batch(["evacuation order"], nlu=client, cache=cache)
+
+    assert sleeps == [NLU_BACKOFF_MAX]
+
+
+def test_failed_text_returns_its_exception(sleeps, cache):
+    client = FakeNlu({"bad request": [ApiException(400, message="unsupported text language")]})
+
+    results = extract_keywords_batch(["flood warning", "bad request", "road closure"], nlu=client, cache=cache)
+
+    assert results[0] == ["flood", "warning"]
+    assert isinstance(results[1], ApiException) and results[1].status_code == 400
+    assert results[2] == ["road", "closure"]
+    assert sleeps == []
+
+
+def test_failures_are_not_cached(sleeps, cache):
+    client = FakeNlu({"bad request": [ApiException(400, message="unsupported text language")]})
+    extract_keywords_batch(["flood warning", "bad request"], nlu=client, cache=cache)
+
+    results = extract_keywords_batch(["flood warning", "bad request"], nlu=client, cache=cache)
+
+    assert results == [["flood", "warning"], ["bad", "request"]]
+    assert client.calls.count("flood warning") == 1
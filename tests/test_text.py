@@ -0,0 +1,44 @@
+import time
+
+from utils.text import html_to_text, html_to_text_batch
+
+
+def test_drops_nested_skipped_elements():
+    markup = "<p>before</p><svg><g><svg><text>icon</text></svg></g></svg><script>var x = '<b>';</script><p>after</p>"
+
+    assert html_to_text(markup) == "before after"
+
+
+def test_self_closing_skipped_tags_do_not_hide_following_text():
+    assert html_to_text("<p>Fire<svg/> spreads</p>") == "Fire spreads"
+    assert html_to_text('<script src="x.js" />Evacuate now<br/>north') == "Evacuate now north"
+
+
+def test_decodes_entities_after_removing_tags():
+    assert html_to_text("Smoke &amp; ash &lt;b&gt; &#8212; <b>bold</b>&nbsp;text") == "Smoke & ash <b> — bold text"
+
+
+def test_strips_comments_blocks_and_truncation_marker():
+    markup = "<!-- hidden --><h1>Title</h1><div>Body text… [+1234 chars]"
+
+    assert html_to_text(markup) == "Title Body text"
+
+
+def test_batch_handles_missing_values():
+    assert html_to_text_batch([None, "", "<i>ok</i>"]) == ["", "", "ok"]
+
+
+def test_large_input_with_stray_brackets_stays_linear():
+    small = "a < b " * 2_000 + "<p>text</p>" * 2_000
+    large = small * 16
+
+    start = time.perf_counter()
+    html_to_text(small)
+    small_time = time.perf_counter() - start
+    start = time.perf_counter()
+    text = html_to_text(large)
+    large_time = time.perf_counter() - start
+
+    assert text.startswith("a < b a < b")
+    # 16 times the input: a quadratic scan would take ~256 times as long
+    assert large_time < max(small_time, 0.001) * 64
@@ -0,0 +1,128 @@
+import json
+import os
+
+import plotly.graph_objects as go
+
+CHART_SETTINGS_DIR = "ibm_autoML_visualizations"
+
+SUMMARY_METHODS = ("sum", "count", "mean")
+PIE_COLORS = ["orange", "red", "blue", "green", "purple"]
+
+
+def load_chart_settings(name, directory=CHART_SETTINGS_DIR):
+    with open(os.path.join(directory, f"chart_setting_{name}.json"), "r") as f:
+        return json.load(f)
+
+
+# (field name, listed values or None): AutoML writes categoriesField either as
+# a column name or as {"name", "values"} restricted to the listed values
+def categories_field(settings):
+    field = settings["categoriesField"]
+    if isinstance(field, str):
+        return field, None
+    return field["name"], field.get("values")
+
+
+# Category of each row. With `values`, rows are matched case-insensitively
+# against them and labelled as listed; other rows get no category. On a
+# categorical column the mapping runs once per category, not once per row.
+def category_labels(column, values=None):
+    if values is None:
+        return column
+    wanted = {value.casefold(): value for value in values}
+    return column.map(lambda label: wanted.get(str(label).casefold()))
+
+
+# One aggregate per key, rows without a key skipped. Without `values` only
+# "count" applies and counts rows.
+def summarize(keys, values, method):
+    if method not in SUMMARY_METHODS:
+        raise ValueError(f"Unsupported summaryMethod: {method}")
+    if values is None:
+        if method != "count":
+            raise ValueError(f"summaryMethod {method} needs a values field")
+        return keys.groupby(keys, observed=True).size()
+    return values.groupby(keys, observed=True).agg(method)
+
+
+def _summary_method(settings, default="sum"):
+    return settings.get("summaryMethod", default if "valuesField" in settings else "count")
+
+
+def pie_figure(store, settings, title=None):
+    name, values = categories_field(settings)
+    keys = category_labels(store.column(name), values)
+    measure = store.column(settings["valuesField"]) if "valuesField" in settings else None
+    totals = summarize(keys, measure, _summary_method(settings)).sort_values(ascending=False)
+
+    fig = go.Figure(
+        data=[
+            go.Pie(
+                labels=totals.index.astype(str),
+                values=totals.to_numpy(),
+                hole=0.3,
+                textinfo="label+percent",
+                marker=dict(colors=PIE_COLORS)
+            )
+        ]
+    )
+    fig.update_layout(title=title)
+    return fig
+
+
+def multiseries_figure(store, settings, title=None):
+    fig = go.Figure()
+    x = store.column(settings["x"])
+
+    for series in settings["multiSeriesFields"]:
+        method = series.get("summaryMethod", settings.get("summaryMethod", "sum"))
+        totals = summarize(x, store.column(series["name"]), method)
+        if series.get("type", "bar") == "line":
+            trace = go.Scatter(x=totals.index, y=totals.to_numpy(), mode="lines+markers", name=series["name"])
+        else:
+            trace = go.Bar(x=totals.index, y=totals.to_numpy(), name=series["name"])
+        fig.add_trace(trace)
+
+    fig.update_layout(
+        title=title,
+        barmode="group",
+        xaxis_title=settings["x"],
+        xaxis_type="category",
+        yaxis_title="Value"
+    )
+    return fig
+
+
+# AutoML's circle packing of row counts along seriesFields. Plotly has no
+# circle packing, so the same hierarchy is drawn as a treemap.
+def cp_figure(store, settings, title=None):
+    fields = settings["seriesFields"]
+    frame = store.frame(fields)
+    ids, labels, parents, values = [], [], [], []
+    for depth in range(1, len(fields) + 1):
+        sizes = frame.groupby(fields[:depth], observed=True).size()
+        for key, size in sizes.items():
+            path = [str(part) for part in (key if isinstance(key, tuple) else (key,))]
+            ids.append("/".join(path))
+            labels.append(path[-1])
+            parents.append("/".join(path[:-1]))
+            values.append(int(size))
+
+    fig = go.Figure(go.Treemap(ids=ids, labels=labels, parents=parents, values=values, branchvalues="total"))
+    fig.update_layout(title=title)
+    return fig
+
+
+CHART_BUILDERS = {
+    "pie": pie_figure,
+    "multiseries": multiseries_figure,
+    "cp": cp_figure,
+}
+
+
+# Figure for an AutoML chart setting, aggregated before it reaches Plotly
+def chart_figure(store, settings, title=None):
+    builder = CHART_BUILDERS.get(settings["type"])
+    if builder is None:
+        raise ValueError(f"Unsupported chart type: {settings['type']}")
+    return builder(store, settings, title)
@@ -0,0 +1,138 @@
+import logging
+import os
+import re
+from functools import lru_cache
+
+from utils.llm import LLM_MODEL, get_inference_client
+
+logger = logging.getLogger(__name__)
+
+# Prompt tokens allowed for the system prompt, summary and history together
+CHAT_TOKEN_BUDGET = int(os.environ.get("CHAT_TOKEN_BUDGET", 2048))
+
+# Once over budget, older turns are folded until the prompt is back under
+# this share of it, so the summary is refreshed every few turns, not every turn
+BUDGET_LOW_WATERMARK = 0.75
+
+# Latest messages always sent verbatim
+RECENT_MESSAGES = 4
+
+SUMMARY_MAX_TOKENS = 200
+TOKENIZER_MODEL = os.environ.get("TOKENIZER_MODEL", LLM_MODEL)
+
+# Role markers and separators the chat template adds around each message
+MESSAGE_OVERHEAD = 4
+
+SUMMARY_PROMPT = (
+    "Summarize the conversation below between a user and a disaster relief assistant in under 120 words. "
+    "Keep every concrete fact: places, dates, phone numbers, needs and decisions.\n\n"
+    "Earlier summary:\n{summary}\n\nConversation:\n{conversation}"
+)
+
+PIECE_RE = re.compile(r"\w+|[^\w\s]")
+
+
+# The model's tokenizer when it can be loaded, else an estimate from word
+# pieces (Llama tokenizers average a little over one token per word piece)
+@lru_cache(maxsize=None)
+def _tokenizer():
+    try:
+        from tokenizers import Tokenizer
+
+        return Tokenizer.from_pretrained(TOKENIZER_MODEL)
+    except Exception as e:
+        logger.info("Estimating token counts, tokenizer for %s unavailable: %s", TOKENIZER_MODEL, e)
+        return None
+
+
+def count_tokens(text):
+    tokenizer = _tokenizer()
+    if tokenizer is None:
+        return int(len(PIECE_RE.findall(text)) * 1.3) + 1
+    return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+# Longest prefix of `text`, cut at a word boundary, that fits in `limit` tokens
+def truncate_tokens(text, limit):
+    if count_tokens(text) <= limit:
+        return text
+    words = text.split()
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:middle])) <= limit:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low])
+
+
+# Tokens of one message, cached: each turn counts only the messages it adds
+@lru_cache(maxsize=8192)
+def message_tokens(role, content):
+    return count_tokens(content) + MESSAGE_OVERHEAD
+
+
+def _tokens(message):
+    return message_tokens(message["role"], message["content"])
+
+
+# Fold messages into the running summary with one short, non-streamed call
+def summarize(summary, messages, client=None):
+    conversation = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+    response = (client or get_inference_client()).chat.completions.create(
+        model=LLM_MODEL,
+        messages=[{"role": "user", "content": SUMMARY_PROMPT.format(summary=summary or "(none)", conversation=conversation)}],
+        max_tokens=SUMMARY_MAX_TOKENS,
+        temperature=0.01,
+    )
+    return response.choices[0].message.content.strip()
+
+
+# Per-session view of the chat history that fits a token budget. The system
+# prompt and the latest messages go out verbatim; older turns are folded into
+# a rolling summary appended to the system prompt, or dropped when the
+# summary cannot be produced. `folded` counts the history messages already
+# covered by the summary.
+class ConversationMemory:
+    def __init__(self, budget=CHAT_TOKEN_BUDGET, recent=RECENT_MESSAGES, summarizer=summarize):
+        self.budget = budget
+        self.recent = recent
+        self.summarizer = summarizer
+        self.summary = ""
+        self.folded = 0
+
+    def _system(self, system):
+        if not self.summary:
+            return system
+        return {**system, "content": f"{system['content']}\n\nSummary of the earlier conversation: {self.summary}"}
+
+    # Messages to send for `messages`, the full history starting with the
+    # system prompt
+    def prompt(self, messages):
+        system, history = messages[0], messages[1:]
+        live = history[self.folded:]
+        sizes = [_tokens(message) for message in live]
+        total = _tokens(self._system(system)) + sum(sizes)
+        if total > self.budget:
+            target = self.budget * BUDGET_LOW_WATERMARK
+            fold = 0
+            while fold < len(live) - self.recent and total > target:
+                total -= sizes[fold]
+                fold += 1
+            if fold:
+                try:
+                    self.summary = self.summarizer(self.summary, live[:fold])
+                except Exception as e:
+                    logger.warning("Dropping %d old messages, summary failed: %s", fold, e)
+                self.folded += fold
+                live = live[fold:]
+                sizes = sizes[fold:]
+            # A new summary can be longer than the turns it replaced; cut it
+            # down to what the budget leaves. Token counts of a prefix and of
+            # the full prompt are not exactly additive, so re-check until it fits.
+            over = _tokens(self._system(system)) + sum(sizes) - self.budget
+            while over > 0 and self.summary:
+                self.summary = truncate_tokens(self.summary, count_tokens(self.summary) - over)
+                over = _tokens(self._system(system)) + sum(sizes) - self.budget
+        return [self._system(system)] + live
@@ -0,0 +1,30 @@
+from functools import lru_cache
+
+import firebase_admin
+import streamlit as st
+from firebase_admin import credentials
+from ibmcloudant.cloudant_v1 import CloudantV1
+from ibm_cloud_sdk_core.authenticators import IAMAuthenticator
+
+from utils.config import get_secret
+
+FIREBASE_DATABASE_URL = "https://disaster-resilience-sos123-default-rtdb.firebaseio.com/"
+
+
+# One Cloudant client per process, shared by the pages and the refresher thread
+@lru_cache(maxsize=None)
+def get_cloudant_client():
+    authenticator = IAMAuthenticator(get_secret("CLOUDANT_API_KEY"))
+    client = CloudantV1(authenticator=authenticator)
+    client.set_service_url(get_secret("CLOUDANT_URL"))
+    return client
+
+
+def get_cloudant_db_name():
+    return get_secret("CLOUDANT_DB_NAME")
+
+
+def init_firebase():
+    if not firebase_admin._apps:
+        cred = credentials.Certificate('firebase_credentials.json') or st.secrets["firebase"]['fb_credentials']
+        firebase_admin.initialize_app(cred, {"databaseURL": FIREBASE_DATABASE_URL})
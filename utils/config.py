@@ -0,0 +1,56 @@
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+
+import streamlit as st
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Local working directory for caches, queues and indexes built by the app
+CACHE_DIR = os.environ.get("DRP_CACHE_DIR", os.path.join(os.getcwd(), ".cache"))
+
+
+# Read a credential from the environment first, then from Streamlit secrets
+def get_secret(name):
+    return os.environ.get(name) or st.secrets[name]
+
+
+def cache_path(*parts):
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+# Write to a temp file in the same directory and rename over the target, so
+# readers never see a half-written file
+def atomic_write(filepath, content):
+    directory = os.path.dirname(os.path.abspath(filepath))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# SQLite connection for one unit of work on a local store: WAL mode so readers
+# never block the writer, `schema` (CREATE ... IF NOT EXISTS statements) run
+# on open, committed when the block succeeds and always closed
+@contextmanager
+def connect_sqlite(path, schema=()):
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in schema:
+            conn.execute(statement)
+        yield conn
+        conn.commit()
+    finally:
+        conn.close()
@@ -0,0 +1,426 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from functools import lru_cache
+
+import faiss
+import numpy as np
+
+from utils.config import atomic_write, cache_path, connect_sqlite
+from utils.embeddings import get_embedding_backend
+
+# Below this many chunks the index is exact (flat); from here on it is IVF,
+# retrained whenever the corpus has grown IVF_RETRAIN_GROWTH times since. An
+# IVF index that shrinks below IVF_MIN_VECTORS / IVF_SHRINK_FACTOR goes back
+# to flat; the gap keeps a corpus near the threshold from flipping each update.
+IVF_MIN_VECTORS = 4096
+IVF_RETRAIN_GROWTH = 4
+IVF_SHRINK_FACTOR = 2
+CORPUS_NPROBE = int(os.environ.get("CORPUS_NPROBE", 16))
+
+# Chunks embedded and written per step while a document is added
+EMBED_BATCH_SIZE = 64
+
+# Staged chunks left behind by an ingest that never finished are dropped after this
+STAGING_TTL = 24 * 60 * 60
+
+# Load indexes memory-mapped: the vectors stay in the page cache and are
+# shared between sessions and processes instead of being copied into each
+MMAP_FLAGS = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+
+
+CORPUS_SCHEMA = (
+    (
+        "CREATE TABLE IF NOT EXISTS documents ("
+        " doc_id TEXT PRIMARY KEY,"
+        " name TEXT NOT NULL,"
+        " content_hash TEXT NOT NULL,"
+        " chunk_count INTEGER NOT NULL,"
+        " updated_at REAL NOT NULL)"
+    ),
+    (
+        "CREATE TABLE IF NOT EXISTS chunks ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        " doc_id TEXT NOT NULL,"
+        " position INTEGER NOT NULL,"
+        " chunk_hash TEXT NOT NULL,"
+        " text TEXT NOT NULL,"
+        " metadata TEXT NOT NULL,"
+        " vector BLOB NOT NULL)"
+    ),
+    "CREATE INDEX IF NOT EXISTS chunks_doc_id ON chunks (doc_id)",
+    (
+        "CREATE TABLE IF NOT EXISTS staged_chunks ("
+        " upload_id TEXT NOT NULL,"
+        " position INTEGER NOT NULL,"
+        " chunk_hash TEXT NOT NULL,"
+        " text TEXT NOT NULL,"
+        " metadata TEXT NOT NULL,"
+        " vector BLOB NOT NULL,"
+        " staged_at REAL NOT NULL,"
+        " PRIMARY KEY (upload_id, position))"
+    ),
+    "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+)
+
+
+def _connect(path):
+    return connect_sqlite(path, CORPUS_SCHEMA)
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def chunk_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# Unit-length float32 rows, so inner product is cosine similarity
+def normalized(vectors):
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+# Serialize to memory and swap the file in atomically, so a session that is
+# memory-mapping the previous version never reads a half-written index
+def write_index(path, index):
+    atomic_write(path, faiss.serialize_index(index).tobytes())
+
+
+def read_index(path, mmap=True):
+    return faiss.read_index(path, MMAP_FLAGS if mmap else 0)
+
+
+def _get_meta(conn, name, default=0):
+    row = conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else default
+
+
+def _set_meta(conn, name, value):
+    conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (name, value))
+
+
+# Standing knowledge base shared by every session. Chunk text, metadata and
+# vectors live in SQLite; one FAISS index over all chunks, with the chunk row
+# id as the vector id, is saved next to it and memory-mapped for search.
+# Updating a document re-embeds only the chunks whose text changed.
+class Corpus:
+    def __init__(self, root, embeddings):
+        os.makedirs(root, exist_ok=True)
+        self.db_path = os.path.join(root, "corpus.sqlite3")
+        self.index_path = os.path.join(root, "index.faiss")
+        self.version_path = os.path.join(root, "index.version")
+        self.embeddings = embeddings
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._reader = None
+        self._reader_stamp = None
+
+    # Bumped on every change; anything derived from the corpus keys on it
+    @property
+    def version(self):
+        with _connect(self.db_path) as conn:
+            return _get_meta(conn, "version")
+
+    def documents(self):
+        with _connect(self.db_path) as conn:
+            rows = conn.execute(
+                "SELECT doc_id, name, content_hash, chunk_count, updated_at FROM documents ORDER BY name"
+            ).fetchall()
+        return [
+            {"doc_id": doc_id, "name": name, "content_hash": content_hash, "chunks": chunks, "updated_at": updated_at}
+            for doc_id, name, content_hash, chunks, updated_at in rows
+        ]
+
+    def document(self, doc_id):
+        return next((doc for doc in self.documents() if doc["doc_id"] == doc_id), None)
+
+    # Add a document or replace its previous version. `chunks` may be any
+    # iterable, such as a generator fed by a streaming ingest. It is consumed
+    # batch_size chunks at a time and each batch is embedded and staged in its
+    # own short transaction, without the write lock, so a long ingest never
+    # blocks other writers. The staged document then replaces the previous
+    # version, and the documents in `replaces`, in one transaction: chunks
+    # whose text is unchanged keep their id and vector, and only new text was
+    # embedded.
+    # A document without chunks is not added. Returns {"added", "kept",
+    # "removed"} chunk counts.
+    def add_document(self, doc_id, name, content_hash, chunks, batch_size=EMBED_BATCH_SIZE, replaces=()):
+        replaced = [doc_id, *(other for other in replaces if other != doc_id)]
+        document = self.document(doc_id)
+        if document and document["content_hash"] == content_hash:
+            for other in replaced[1:]:
+                self.remove_document(other)
+            return {"added": 0, "kept": document["chunks"], "removed": 0}
+
+        upload_id = uuid.uuid4().hex
+        try:
+            count = self._stage(upload_id, replaced, chunks, batch_size)
+            # Nothing to index: leave the current versions alone
+            if not count:
+                return {"added": 0, "kept": 0, "removed": 0}
+            return self._replace(upload_id, doc_id, name, content_hash, count, batch_size, replaced)
+        finally:
+            with _connect(self.db_path) as conn:
+                conn.execute(
+                    "DELETE FROM staged_chunks WHERE upload_id = ? OR staged_at < ?",
+                    (upload_id, time.time() - STAGING_TTL)
+                )
+
+    # Embed and stage every chunk, reusing the vector of a chunk one of the
+    # replaced documents already has. Returns the number of chunks staged.
+    def _stage(self, upload_id, replaced, chunks, batch_size):
+        position = 0
+        for batch in _batches(chunks, batch_size):
+            hashes = [chunk_hash(chunk["text"]) for chunk in batch]
+            with _connect(self.db_path) as conn:
+                vectors = dict(conn.execute(
+                    f"SELECT chunk_hash, vector FROM chunks WHERE doc_id IN ({','.join('?' * len(replaced))})"
+                    f" AND chunk_hash IN ({','.join('?' * len(hashes))})",
+                    [*replaced, *hashes]
+                ))
+            new = [i for i, hash_ in enumerate(hashes) if hash_ not in vectors]
+            if new:
+                embedded = normalized(self.embeddings.embed([batch[i]["text"] for i in new]))
+                for i, vector in zip(new, embedded):
+                    vectors[hashes[i]] = vector.tobytes()
+            staged_at = time.time()
+            with _connect(self.db_path) as conn:
+                conn.executemany(
+                    "INSERT INTO staged_chunks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (upload_id, position + i, hash_, chunk["text"], json.dumps(chunk["metadata"]), vectors[hash_], staged_at)
+                        for i, (hash_, chunk) in enumerate(zip(hashes, batch))
+                    ]
+                )
+            position += len(batch)
+        return position
+
+    # Swap the staged chunks in for the document's current ones and update
+    # the index; database work only, nothing is parsed or embedded here
+    def _replace(self, upload_id, doc_id, name, content_hash, count, batch_size, replaced):
+        with self._write_lock, _connect(self.db_path) as conn:
+            placeholders = ",".join("?" * len(replaced))
+            existing = {}
+            for id_, hash_ in conn.execute(
+                f"SELECT id, chunk_hash FROM chunks WHERE doc_id IN ({placeholders})", replaced
+            ):
+                existing.setdefault(hash_, []).append(id_)
+            index = self._open_index(conn)
+            added = kept = 0
+            staged = conn.execute(
+                "SELECT position, chunk_hash, text, metadata, vector FROM staged_chunks"
+                " WHERE upload_id = ? ORDER BY position",
+                (upload_id,)
+            )
+            while True:
+                batch = staged.fetchmany(batch_size)
+                if not batch:
+                    break
+                new_ids, new_vectors = [], []
+                for position, hash_, text, metadata, vector in batch:
+                    if existing.get(hash_):
+                        conn.execute(
+                            "UPDATE chunks SET doc_id = ?, position = ?, metadata = ? WHERE id = ?",
+                            (doc_id, position, metadata, existing[hash_].pop())
+                        )
+                        kept += 1
+                        continue
+                    cursor = conn.execute(
+                        "INSERT INTO chunks (doc_id, position, chunk_hash, text, metadata, vector)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        (doc_id, position, hash_, text, metadata, vector)
+                    )
+                    new_ids.append(cursor.lastrowid)
+                    new_vectors.append(np.frombuffer(vector, dtype=np.float32))
+                if index is not None and new_ids:
+                    index.add_with_ids(np.vstack(new_vectors), np.array(new_ids, dtype=np.int64))
+                added += len(new_ids)
+
+            removed = [id_ for ids in existing.values() for id_ in ids]
+            conn.executemany("DELETE FROM chunks WHERE id = ?", [(id_,) for id_ in removed])
+            if index is not None and removed:
+                index.remove_ids(np.array(removed, dtype=np.int64))
+            conn.execute(f"DELETE FROM documents WHERE doc_id IN ({placeholders})", replaced)
+            conn.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)",
+                (doc_id, name, content_hash, count, time.time())
+            )
+            self._commit_index(conn, index)
+            return {"added": added, "kept": kept, "removed": len(removed)}
+
+    def remove_document(self, doc_id):
+        with self._write_lock, _connect(self.db_path) as conn:
+            removed = [id_ for (id_,) in conn.execute("SELECT id FROM chunks WHERE doc_id = ?", (doc_id,))]
+            conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+            conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+            index = self._open_index(conn)
+            if index is not None and removed:
+                index.remove_ids(np.array(removed, dtype=np.int64))
+            self._commit_index(conn, index)
+            return len(removed)
+
+    def _index_version(self):
+        try:
+            with open(self.version_path, "r") as f:
+                return int(f.read())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    # Writable copy of the on-disk index to apply a change to, or None when it
+    # has to be rebuilt from SQLite. The index file is stamped with the corpus
+    # version it reflects, so one left behind by an interrupted update is
+    # rebuilt instead of patched.
+    def _open_index(self, conn):
+        if os.path.exists(self.index_path) and self._index_version() == _get_meta(conn, "version"):
+            return read_index(self.index_path, mmap=False)
+        return None
+
+    # Commit the change, bump the version and save the updated index. Search
+    # skips ids that are no longer in SQLite.
+    def _commit_index(self, conn, index):
+        version = _get_meta(conn, "version") + 1
+        if index is not None and self._needs_training(conn, index):
+            index = None
+        _set_meta(conn, "version", version)
+        conn.commit()
+
+        if index is None:
+            index = self._build_index(conn)
+        if index is None:
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+        else:
+            write_index(self.index_path, index)
+        atomic_write(self.version_path, str(version).encode("utf-8"))
+
+    # Whether the index type or its trained lists no longer suit its size
+    def _needs_training(self, conn, index):
+        if isinstance(index, faiss.IndexIVF):
+            return (
+                index.ntotal > IVF_RETRAIN_GROWTH * _get_meta(conn, "trained_size", index.ntotal)
+                or index.ntotal * IVF_SHRINK_FACTOR < IVF_MIN_VECTORS
+            )
+        return index.ntotal >= IVF_MIN_VECTORS
+
+    # Fresh index over every chunk vector in SQLite: exact for a small corpus,
+    # IVF with about sqrt(n) lists for a large one
+    def _build_index(self, conn):
+        rows = conn.execute("SELECT id, vector FROM chunks").fetchall()
+        if not rows:
+            return None
+        ids = np.array([id_ for id_, _ in rows], dtype=np.int64)
+        vectors = np.vstack([np.frombuffer(vector, dtype=np.float32) for _, vector in rows])
+        dimensions = vectors.shape[1]
+        if len(rows) < IVF_MIN_VECTORS:
+            index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimensions))
+        else:
+            nlist = int(math.sqrt(len(rows)))
+            index = faiss.IndexIVFFlat(faiss.IndexFlatIP(dimensions), dimensions, nlist, faiss.METRIC_INNER_PRODUCT)
+            index.train(vectors)
+            _set_meta(conn, "trained_size", len(rows))
+        index.add_with_ids(vectors, ids)
+        return index
+
+    # Memory-mapped index, reloaded when another session or process rewrote it
+    def _index(self):
+        with self._read_lock:
+            try:
+                stat = os.stat(self.index_path)
+            except FileNotFoundError:
+                return None
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if stamp != self._reader_stamp:
+                self._reader = read_index(self.index_path)
+                self._reader_stamp = stamp
+            return self._reader
+
+    # (chunk, score) for the k chunks closest to an already embedded query.
+    # doc_ids, when given, restricts the search to those documents.
+    def search(self, query_vector, k=4, doc_ids=None):
+        index = self._index()
+        if index is None or index.ntotal == 0:
+            return []
+        options = {}
+        with _connect(self.db_path) as conn:
+            if doc_ids is not None:
+                doc_ids = list(doc_ids)
+                placeholders = ",".join("?" * len(doc_ids))
+                allowed = [id_ for (id_,) in conn.execute(
+                    f"SELECT id FROM chunks WHERE doc_id IN ({placeholders})", doc_ids
+                )]
+                if not allowed:
+                    return []
+                options["sel"] = faiss.IDSelectorBatch(np.array(allowed, dtype=np.int64))
+            if isinstance(index, faiss.IndexIVF):
+                # A filter that keeps a small share of the corpus leaves few
+                # matches per list, so probe proportionally more lists
+                nprobe = CORPUS_NPROBE
+                if doc_ids is not None:
+                    nprobe = math.ceil(CORPUS_NPROBE * index.ntotal / len(allowed))
+                params = faiss.SearchParametersIVF(nprobe=min(nprobe, index.nlist), **options)
+            else:
+                params = faiss.SearchParameters(**options) if options else None
+            scores, ids = index.search(normalized([query_vector]), k, params=params)
+            hits = [(int(id_), float(score)) for id_, score in zip(ids[0], scores[0]) if id_ >= 0]
+            return self._chunks(conn, hits)
+
+    def _chunks(self, conn, hits):
+        if not hits:
+            return []
+        placeholders = ",".join("?" * len(hits))
+        rows = {
+            id_: {"id": id_, "doc_id": doc_id, "name": name, "text": text, "metadata": json.loads(metadata)}
+            for id_, doc_id, name, text, metadata in conn.execute(
+                "SELECT c.id, c.doc_id, d.name, c.text, c.metadata FROM chunks c"
+                f" JOIN documents d ON d.doc_id = c.doc_id WHERE c.id IN ({placeholders})",
+                [id_ for id_, _ in hits]
+            )
+        }
+        return [(rows[id_], score) for id_, score in hits if id_ in rows]
+
+    # {chunk id: doc_id} for every chunk, for indexes kept alongside FAISS
+    def chunk_ids(self):
+        with _connect(self.db_path) as conn:
+            return dict(conn.execute("SELECT id, doc_id FROM chunks"))
+
+    # Chunks by id, in the order given; ids no longer in the corpus are skipped
+    def chunks(self, ids):
+        ids = list(ids)
+        found = []
+        with _connect(self.db_path) as conn:
+            for start in range(0, len(ids), 500):
+                found.extend(chunk for chunk, _ in self._chunks(conn, [(id_, 0.0) for id_ in ids[start:start + 500]]))
+        return found
+
+    def query(self, text, k=4, doc_ids=None):
+        return self.search(self.embeddings.embed([text])[0], k, doc_ids)
+
+
+# One corpus per embedding model, each in its own directory of the cache
+def corpus_root(slug):
+    return os.path.dirname(cache_path("corpus", slug, "corpus.sqlite3"))
+
+
+# One corpus per process for the configured embedding backend
+@lru_cache(maxsize=None)
+def get_corpus():
+    embeddings = get_embedding_backend()
+    return Corpus(corpus_root(embeddings.slug), embeddings)
@@ -0,0 +1,124 @@
+import json
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+
+from ibmcloudant.cloudant_v1 import BulkDocs, Document
+
+from utils.config import cache_path, connect_sqlite
+
+# Durable local queue of donations not yet written to Cloudant; resolved on
+# first use, not on import
+def queue_path():
+    return cache_path("donations", "queue.sqlite3")
+
+
+FLUSH_BATCH_SIZE = 100
+
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+QUEUE_SCHEMA = (
+    (
+        "CREATE TABLE IF NOT EXISTS pending ("
+        " id TEXT PRIMARY KEY,"
+        " doc TEXT NOT NULL,"
+        " queued_at REAL NOT NULL,"
+        " attempts INTEGER NOT NULL DEFAULT 0,"
+        " last_error TEXT)"
+    ),
+)
+
+
+def _connect(path):
+    return connect_sqlite(path, QUEUE_SCHEMA)
+
+
+# Check the form input and build the donation document, raising ValueError
+# with a message the page can show
+def build_donation(name, email, amount, comment=""):
+    name = (name or "").strip()
+    email = (email or "").strip()
+    if not name:
+        raise ValueError("Please enter your name.")
+    if not EMAIL_PATTERN.match(email):
+        raise ValueError("Please enter a valid email address.")
+    try:
+        amount = float(amount)
+    except (TypeError, ValueError):
+        raise ValueError("Please enter a valid donation amount.")
+    if amount <= 0:
+        raise ValueError("Donation amount must be greater than zero.")
+    return {
+        "name": name,
+        "email": email,
+        "amount": int(amount) if amount.is_integer() else amount,
+        "comment": comment or "",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+# Persist a donation locally and return its document id. The id is fixed
+# here, so however often the flush is retried Cloudant stores it only once.
+def enqueue_donation(donation, path=None):
+    doc_id = f"donation:{uuid.uuid4().hex}"
+    doc = dict(donation, _id=doc_id)
+    with _connect(path or queue_path()) as conn:
+        conn.execute(
+            "INSERT INTO pending (id, doc, queued_at) VALUES (?, ?, ?)",
+            (doc_id, json.dumps(doc), time.time())
+        )
+    return doc_id
+
+
+def pending_count(path=None):
+    with _connect(path or queue_path()) as conn:
+        return conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+
+
+# Send queued donations to Cloudant with post_bulk_docs, oldest first. A
+# document is removed from the queue once Cloudant accepts it, or reports a
+# conflict because an earlier attempt already stored it. Rejected documents
+# and whole batches whose request failed stay queued with their attempt
+# count and last error.
+def flush_queue(client, db_name, batch_size=FLUSH_BATCH_SIZE, path=None):
+    sent = failed = 0
+    with _connect(path or queue_path()) as conn:
+        while True:
+            rows = conn.execute(
+                "SELECT id, doc FROM pending ORDER BY queued_at LIMIT ?", (batch_size,)
+            ).fetchall()
+            if not rows:
+                break
+            docs = [Document.from_dict(json.loads(doc)) for _, doc in rows]
+            try:
+                results = client.post_bulk_docs(db=db_name, bulk_docs=BulkDocs(docs=docs)).get_result()
+            except Exception as e:
+                # Nothing in the batch is known to be stored: count the attempt
+                # for all of it and let the refresher report the failure
+                conn.executemany(
+                    "UPDATE pending SET attempts = attempts + 1, last_error = ? WHERE id = ?",
+                    [(str(e), doc_id) for doc_id, _ in rows]
+                )
+                conn.commit()
+                raise
+
+            done, errors = [], []
+            for result in results:
+                if result.get("ok") or result.get("error") == "conflict":
+                    done.append((result["id"],))
+                else:
+                    errors.append((f"{result.get('error')}: {result.get('reason')}", result["id"]))
+            conn.executemany("DELETE FROM pending WHERE id = ?", done)
+            conn.executemany(
+                "UPDATE pending SET attempts = attempts + 1, last_error = ? WHERE id = ?", errors
+            )
+            conn.commit()
+            sent += len(done)
+            failed += len(errors)
+            # Leave rejected documents for the next scheduled flush
+            if errors or len(rows) < batch_size:
+                break
+        pending = conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+    return {"sent": sent, "failed": failed, "pending": pending}
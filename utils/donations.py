@@ -0,0 +1,221 @@
+import heapq
+import threading
+
+from utils.config import cache_path, connect_sqlite
+
+CHANGES_BATCH_SIZE = 500
+
+ALL_DOCS_PAGE_SIZE = 200
+
+
+# Where the running totals, the per-document contributions and the _changes
+# checkpoint are persisted; resolved on first use, not on import
+def aggregate_path():
+    return cache_path("donations", "aggregate.sqlite3")
+
+
+AGGREGATE_SCHEMA = (
+    (
+        "CREATE TABLE IF NOT EXISTS contributions ("
+        " doc_id TEXT PRIMARY KEY,"
+        " amount REAL NOT NULL,"
+        " name TEXT NOT NULL,"
+        " day TEXT NOT NULL)"
+    ),
+    (
+        "CREATE TABLE IF NOT EXISTS buckets ("
+        " kind TEXT NOT NULL,"
+        " key TEXT NOT NULL,"
+        " amount REAL NOT NULL,"
+        " PRIMARY KEY (kind, key))"
+    ),
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+)
+
+
+def _connect(path):
+    return connect_sqlite(path, AGGREGATE_SCHEMA)
+
+
+def _parse_amount(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# Day bucket for a donation, from the created_at timestamp written by the
+# Donations page; documents from before that field existed are "undated"
+def _donation_day(doc):
+    created_at = doc.get("created_at")
+    if isinstance(created_at, str) and len(created_at) >= 10:
+        return created_at[:10]
+    return "undated"
+
+
+# Dollar amount for display, e.g. "$1,234.50"; unparseable amounts show as $0.00
+def format_usd(amount):
+    return f"${_parse_amount(amount) or 0.0:,.2f}"
+
+
+def _contribution(doc, deleted=False):
+    amount = None if deleted or doc is None else _parse_amount(doc.get("amount"))
+    if amount is None:
+        return None
+    return (amount, doc.get("name") or "Anonymous", _donation_day(doc))
+
+
+# Running donation totals kept up to date from the Cloudant _changes feed.
+# Totals per donor and per day live in memory. What each document added,
+# needed to subtract edits and deletions again, stays in SQLite and is read
+# and written only for the documents in a batch, so each batch costs the
+# same however many donations there are.
+class DonationAggregate:
+    def __init__(self, path=None):
+        self.path = path or aggregate_path()
+        self.since = "0"
+        self.total = 0.0
+        self.count = 0
+        self.by_donor = {}
+        self.by_day = {}
+        self._load()
+
+    def _buckets(self):
+        return {"donor": self.by_donor, "day": self.by_day}
+
+    def _load(self):
+        with _connect(self.path) as conn:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            self.since = meta.get("since", "0")
+            self.total = float(meta.get("total", 0.0))
+            self.count = int(meta.get("count", 0))
+            buckets = self._buckets()
+            for kind, key, amount in conn.execute("SELECT kind, key, amount FROM buckets"):
+                buckets[kind][key] = amount
+
+    def _add(self, contribution, sign, touched):
+        amount, name, day = contribution
+        self.total += sign * amount
+        self.count += sign
+        for kind, key in (("donor", name), ("day", day)):
+            bucket = self._buckets()[kind]
+            bucket[key] = bucket.get(key, 0.0) + sign * amount
+            if sign < 0 and abs(bucket[key]) < 1e-9:
+                del bucket[key]
+            touched.add((kind, key))
+
+    # Apply one page of _changes results and persist it together with the new
+    # checkpoint in a single transaction
+    def apply_changes(self, changes, since):
+        changes = [change for change in changes if not change["id"].startswith("_design/")]
+        ids = list({change["id"] for change in changes})
+        touched = set()
+        with _connect(self.path) as conn:
+            current = {}
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT doc_id, amount, name, day FROM contributions WHERE doc_id IN ({','.join('?' * len(batch))})",
+                    batch
+                )
+                current.update((doc_id, (amount, name, day)) for doc_id, amount, name, day in rows)
+            for change in changes:
+                previous = current.get(change["id"])
+                if previous:
+                    self._add(previous, -1, touched)
+                contribution = _contribution(change.get("doc"), change.get("deleted", False))
+                if contribution:
+                    self._add(contribution, 1, touched)
+                current[change["id"]] = contribution
+
+            for doc_id in ids:
+                if current.get(doc_id):
+                    conn.execute("INSERT OR REPLACE INTO contributions VALUES (?, ?, ?, ?)", (doc_id, *current[doc_id]))
+                else:
+                    conn.execute("DELETE FROM contributions WHERE doc_id = ?", (doc_id,))
+            buckets = self._buckets()
+            for kind, key in touched:
+                if key in buckets[kind]:
+                    conn.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", (kind, key, buckets[kind][key]))
+                else:
+                    conn.execute("DELETE FROM buckets WHERE kind = ? AND key = ?", (kind, key))
+            self.since = since
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                [("since", str(since)), ("total", repr(self.total)), ("count", str(self.count))]
+            )
+
+    @property
+    def top_donor(self):
+        if not self.by_donor:
+            return None
+        name = max(self.by_donor, key=self.by_donor.get)
+        return {"name": name, "amount": self.by_donor[name]}
+
+    # Small, render-ready view of the totals for the snapshot store
+    def summary(self):
+        return {
+            "total": self.total,
+            "count": self.count,
+            "top_donor": self.top_donor,
+            "by_day": dict(sorted(self.by_day.items())),
+        }
+
+
+# Apply every change after the checkpoint, one batch at a time, persisting the
+# new checkpoint with each batch. Returns the number of changes applied.
+def sync_aggregate(client, db_name, aggregate, batch_size=CHANGES_BATCH_SIZE):
+    applied = 0
+    while True:
+        response = client.post_changes(
+            db=db_name,
+            since=aggregate.since,
+            include_docs=True,
+            limit=batch_size
+        ).get_result()
+        results = response.get("results", [])
+        if results:
+            aggregate.apply_changes(results, response.get("last_seq", aggregate.since))
+        applied += len(results)
+        if not results or not response.get("pending"):
+            return applied
+
+
+# Process-wide aggregate that the refresher keeps in sync
+class DonationAggregator:
+    def __init__(self, client, db_name, path=None):
+        self.client = client
+        self.db_name = db_name
+        self.aggregate = DonationAggregate(path)
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        with self._lock:
+            sync_aggregate(self.client, self.db_name, self.aggregate)
+            return self.aggregate.summary()
+
+
+# Stream donation documents page by page through _all_docs. Each request asks
+# for one extra row whose id becomes the next start_key, so only one page is
+# held in memory at a time. `fields` limits each yielded dict to those keys.
+def iter_donations(client, db_name, page_size=ALL_DOCS_PAGE_SIZE, fields=None):
+    start_key = None
+    while True:
+        options = {"db": db_name, "include_docs": True, "limit": page_size + 1}
+        if start_key is not None:
+            options["start_key"] = start_key
+        rows = client.post_all_docs(**options).get_result()["rows"]
+        for row in rows[:page_size]:
+            if row["id"].startswith("_design/") or not row.get("doc"):
+                continue
+            doc = row["doc"]
+            yield {field: doc.get(field) for field in fields} if fields else doc
+        if len(rows) <= page_size:
+            return
+        start_key = rows[page_size]["id"]
+
+
+# Largest n donations, holding at most n documents while streaming
+def top_donations(client, db_name, n=10, fields=("name", "amount", "created_at")):
+    donations = iter_donations(client, db_name, fields=fields)
+    return heapq.nlargest(n, donations, key=lambda doc: _parse_amount(doc.get("amount")) or 0.0)
@@ -0,0 +1,227 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from utils.config import cache_path, connect_sqlite, get_secret
+
+logger = logging.getLogger(__name__)
+
+# "local" (sentence-transformers on CPU), "hub" (Hugging Face Inference API)
+# or "hashing" (dependency-free hashing vectorizer, for tests and benchmarks)
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "local")
+
+LOCAL_EMBEDDING_MODEL = os.environ.get("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+HUB_EMBEDDING_MODEL = "sentence-transformers/all-mpnet-base-v2"
+
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", 64))
+EMBEDDING_THREADS = int(os.environ.get("EMBEDDING_THREADS", os.cpu_count() or 1))
+
+HASHING_DIMENSIONS = 768
+
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", 200_000))
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+# Vector cache file shared by every backend; the directory is only created
+# once a cache is opened
+def embedding_cache_path():
+    return cache_path("embeddings", "cache.sqlite3")
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+# Interface shared by every embedding backend. `slug` names the model, so
+# vectors from different models never share a cache entry or an index.
+# Backends are LangChain Embeddings and plug into LangChain vector stores.
+class EmbeddingBackend(Embeddings, ABC):
+    name = "base"
+    model = ""
+
+    @property
+    def slug(self):
+        return re.sub(r"[^A-Za-z0-9_.-]+", "_", f"{self.name}-{self.model}")
+
+    # float32 array with one row per text
+    @abstractmethod
+    def embed(self, texts):
+        pass
+
+    def embed_documents(self, texts):
+        return self.embed(list(texts)).tolist()
+
+    def embed_query(self, text):
+        return self.embed([text])[0].tolist()
+
+
+# Token and token-bigram counts hashed into a fixed number of signed buckets
+class HashingEmbeddingBackend(EmbeddingBackend):
+    name = "hashing"
+
+    def __init__(self, dimensions=HASHING_DIMENSIONS):
+        self.dimensions = dimensions
+        self.model = str(dimensions)
+
+    def _vector(self, text):
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        tokens = TOKEN_RE.findall(text.lower())
+        for feature in tokens + [a + " " + b for a, b in zip(tokens, tokens[1:])]:
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dimensions] += 1.0 if h & 0x80000000 else -1.0
+        # Sublinear term frequency, so one repeated word does not dominate
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed(self, texts):
+        if not texts:
+            return np.empty((0, self.dimensions), dtype=np.float32)
+        return np.vstack([self._vector(text) for text in texts])
+
+
+# sentence-transformers model run in-process on the CPU, batched, with the
+# torch thread pool sized by EMBEDDING_THREADS
+class LocalEmbeddingBackend(EmbeddingBackend):
+    name = "local"
+
+    def __init__(self, model=LOCAL_EMBEDDING_MODEL, batch_size=EMBEDDING_BATCH_SIZE, threads=EMBEDDING_THREADS):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        torch.set_num_threads(threads)
+        self.model = model
+        self.batch_size = batch_size
+        self._model = SentenceTransformer(model, device="cpu")
+        self._lock = threading.Lock()
+
+    def embed(self, texts):
+        # One encode at a time; torch already spreads each batch over the threads
+        with self._lock:
+            return self._model.encode(
+                texts, batch_size=self.batch_size, convert_to_numpy=True, show_progress_bar=False
+            ).astype(np.float32)
+
+
+# Hugging Face Inference API, with batches sent concurrently
+class HubEmbeddingBackend(EmbeddingBackend):
+    name = "hub"
+
+    def __init__(self, model=HUB_EMBEDDING_MODEL, batch_size=EMBEDDING_BATCH_SIZE, threads=EMBEDDING_THREADS):
+        from huggingface_hub import InferenceClient
+
+        self.model = model
+        self.batch_size = batch_size
+        self.threads = threads
+        self._client = InferenceClient(model=model, token=get_secret("HF_TOKEN"))
+
+    def _embed_batch(self, texts):
+        return np.asarray(self._client.feature_extraction(texts), dtype=np.float32)
+
+    def embed(self, texts):
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        batches = list(_batches(texts, self.batch_size))
+        with ThreadPoolExecutor(max_workers=min(self.threads, len(batches))) as pool:
+            return np.vstack(list(pool.map(self._embed_batch, batches)))
+
+
+EMBEDDING_CACHE_SCHEMA = (
+    (
+        "CREATE TABLE IF NOT EXISTS vectors ("
+        " key TEXT PRIMARY KEY,"
+        " vector BLOB NOT NULL,"
+        " last_used REAL NOT NULL)"
+    ),
+    "CREATE INDEX IF NOT EXISTS vectors_last_used ON vectors (last_used)",
+)
+
+
+def _connect(path):
+    return connect_sqlite(path, EMBEDDING_CACHE_SCHEMA)
+
+
+# Persistent per-chunk embedding cache in front of a backend: a chunk seen
+# before, in this document or any other, is never embedded twice by the
+# same model. Least recently used vectors are evicted past max_entries.
+class CachedEmbeddings(EmbeddingBackend):
+    def __init__(self, backend, path=None, max_entries=EMBEDDING_CACHE_MAX_ENTRIES):
+        self.backend = backend
+        self.name = backend.name
+        self.model = backend.model
+        self.path = path or embedding_cache_path()
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.slug}\0{text}".encode("utf-8")).hexdigest()
+
+    def _get_many(self, keys):
+        found = {}
+        with self._lock, _connect(self.path) as conn:
+            for batch in _batches(list(dict.fromkeys(keys)), 500):
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(f"SELECT key, vector FROM vectors WHERE key IN ({placeholders})", batch)
+                found.update((key, np.frombuffer(vector, dtype=np.float32)) for key, vector in rows)
+            conn.executemany("UPDATE vectors SET last_used = ? WHERE key = ?", [(time.time(), key) for key in found])
+        return found
+
+    def _put_many(self, items):
+        with self._lock, _connect(self.path) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO vectors VALUES (?, ?, ?)",
+                [(key, vector.astype(np.float32).tobytes(), time.time()) for key, vector in items.items()]
+            )
+            excess = conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM vectors WHERE key IN (SELECT key FROM vectors ORDER BY last_used LIMIT ?)",
+                    (excess,)
+                )
+
+    def embed(self, texts):
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        keys = [self._key(text) for text in texts]
+        cached = self._get_many(keys)
+        missing = {key: text for key, text in zip(keys, texts) if key not in cached}
+        if missing:
+            vectors = self.backend.embed(list(missing.values()))
+            fetched = dict(zip(missing, vectors))
+            self._put_many(fetched)
+            cached.update(fetched)
+        return np.vstack([cached[key] for key in keys])
+
+
+BACKENDS = {
+    "local": LocalEmbeddingBackend,
+    "hub": HubEmbeddingBackend,
+    "hashing": HashingEmbeddingBackend,
+}
+
+
+# One cached backend per process. Without sentence-transformers installed the
+# local backend falls back to the Inference API.
+@lru_cache(maxsize=None)
+def get_embedding_backend(name=EMBEDDING_BACKEND):
+    try:
+        backend = BACKENDS[name]()
+    except ImportError:
+        if name != "local":
+            raise
+        logger.warning("sentence-transformers is not installed; embedding with the Inference API")
+        backend = HubEmbeddingBackend()
+    return CachedEmbeddings(backend)
@@ -0,0 +1,96 @@
+import os
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Default look-back window for "recent" events
+DEFAULT_WINDOW = timedelta(days=int(os.environ.get("GDACS_WINDOW_DAYS", 90)))
+
+ALERT_LEVELS = ["Green", "Orange", "Red"]
+
+EVENT_TYPES = {
+    "EQ": "Earthquake",
+    "TC": "Tropical Cyclone",
+    "FL": "Flood",
+    "VO": "Volcano",
+    "DR": "Drought",
+    "WF": "Wildfire",
+}
+
+GDACS_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+# Representative point of a feature: the point itself, else the bbox centre
+def _feature_point(feature):
+    geometry = feature.get("geometry") or {}
+    if geometry.get("type") == "Point":
+        lon, lat = geometry["coordinates"][:2]
+        return lat, lon
+    bbox = feature.get("bbox")
+    if bbox and len(bbox) >= 4:
+        return (bbox[1] + bbox[3]) / 2, (bbox[0] + bbox[2]) / 2
+    return np.nan, np.nan
+
+
+# Parse GDACS features into one typed, columnar table. The `feature` column is
+# the position in the source list, so geometries can be looked up without
+# copying them into the table.
+def build_event_table(features):
+    columns = {
+        "feature": [], "eventid": [], "eventtype": [], "eventname": [], "description": [],
+        "alertlevel": [], "country": [], "fromdate": [], "todate": [],
+        "lat": [], "lon": [], "geometry": [], "report_url": [],
+    }
+    for i, feature in enumerate(features):
+        properties = feature.get("properties") or {}
+        lat, lon = _feature_point(feature)
+        columns["feature"].append(i)
+        columns["eventid"].append(properties.get("eventid"))
+        columns["eventtype"].append(properties.get("eventtype"))
+        columns["eventname"].append(properties.get("eventname", ""))
+        columns["description"].append(properties.get("description", ""))
+        columns["alertlevel"].append(properties.get("alertlevel"))
+        columns["country"].append(properties.get("country", ""))
+        columns["fromdate"].append(properties.get("fromdate"))
+        columns["todate"].append(properties.get("todate"))
+        columns["lat"].append(lat)
+        columns["lon"].append(lon)
+        columns["geometry"].append((feature.get("geometry") or {}).get("type"))
+        columns["report_url"].append((properties.get("url") or {}).get("report"))
+
+    table = pd.DataFrame(columns)
+    table["feature"] = table["feature"].astype(np.int64)
+    table["fromdate"] = pd.to_datetime(table["fromdate"], format=GDACS_DATE_FORMAT, errors="coerce")
+    table["todate"] = pd.to_datetime(table["todate"], format=GDACS_DATE_FORMAT, errors="coerce")
+    table["lat"] = table["lat"].astype(np.float64)
+    table["lon"] = table["lon"].astype(np.float64)
+    table["alertlevel"] = pd.Categorical(table["alertlevel"], categories=ALERT_LEVELS, ordered=True)
+    table["eventtype"] = table["eventtype"].astype("category")
+    table["geometry"] = table["geometry"].astype("category")
+    table["country"] = table["country"].astype("string")
+    table["report_url"] = table["report_url"].fillna("")
+    return table
+
+
+# Built once per feed version and shared by every session; the feature list
+# itself is not hashed (leading underscore)
+@st.cache_resource(max_entries=4)
+def get_event_table(version, _features):
+    return build_event_table(_features)
+
+
+# Vectorised filters over the event table. `window` keeps events whose
+# fromdate falls within that duration before `now` (UTC).
+def filter_events(table, window=DEFAULT_WINDOW, event_types=None, alert_levels=None, now=None):
+    mask = np.ones(len(table), dtype=bool)
+    if window is not None:
+        if now is None:
+            now = pd.Timestamp.now(tz="UTC").tz_localize(None)
+        mask &= (table["fromdate"] >= now - pd.Timedelta(window)).to_numpy()
+    if event_types:
+        mask &= table["eventtype"].isin(event_types).to_numpy()
+    if alert_levels:
+        mask &= table["alertlevel"].isin(alert_levels).to_numpy()
+    return table[mask]
@@ -0,0 +1,166 @@
+import json
+import os
+from functools import lru_cache, partial
+
+import streamlit as st
+from firebase_admin import db
+
+from utils import gdacs
+from utils.clients import get_cloudant_client, get_cloudant_db_name, init_firebase
+from utils.donation_queue import flush_queue
+from utils.donations import DonationAggregator, top_donations
+from utils.news import NEWS_PAGE_SIZE, ArticleFeed, get_news_client, normalize_query
+from utils.snapshots import Refresher, data_version
+from utils.sos import SosIngest, sos_version
+
+GEOJSON_FILEPATH = os.path.join(os.getcwd(), "result.geojson")
+
+# NewsAPI queries the pages show without user input, kept warm in the background
+NEWS_QUERIES = ("LA Wild Fires", "California fires")
+
+# Seconds between background refreshes, per source kind
+REFRESH_INTERVALS = {
+    "gdacs": gdacs.GDACS_TTL,
+    "news": 60 * 60,
+    "donations": 60,
+    "top_donations": 10 * 60,
+    "donation_queue": 5,
+    "sos": 30,
+}
+
+
+def news_source(query):
+    return f"news:{normalize_query(query)}"
+
+
+def _interval(name):
+    return REFRESH_INTERVALS[name.split(":", 1)[0]]
+
+
+# --------------------------------------------- SOURCE LOADERS ---------------------------------------------
+
+# The refresher interval is the TTL, so every run does a conditional GET. A
+# failed download raises: the refresher counts it and the page shows the data
+# as stale, while the previous snapshot keeps being served.
+def load_gdacs():
+    gdacs.fetch_feed(GEOJSON_FILEPATH)
+    with open(GEOJSON_FILEPATH, 'r') as f:
+        return json.load(f)
+
+
+# First page of deduplicated articles for a query through the shared, cached
+# NewsAPI client; later pages are fetched by ArticleFeed when a reader asks
+def load_news(query, limit=NEWS_PAGE_SIZE):
+    return get_news_client().search(query, limit=limit)
+
+
+@lru_cache(maxsize=None)
+def get_donation_aggregator():
+    return DonationAggregator(get_cloudant_client(), get_cloudant_db_name())
+
+
+# Donation totals, advanced incrementally from the Cloudant _changes feed
+def load_donations():
+    return get_donation_aggregator().refresh()
+
+
+# Largest donations, streamed page by page through _all_docs with only the
+# displayed fields kept
+def load_top_donations():
+    return top_donations(get_cloudant_client(), get_cloudant_db_name())
+
+
+# Write queued donations to Cloudant and pull them into the totals right away
+def flush_donations(refresher):
+    result = flush_queue(get_cloudant_client(), get_cloudant_db_name())
+    if result["sent"]:
+        refresher.refresh_now("donations")
+        refresher.refresh_now("top_donations")
+    return result
+
+
+@lru_cache(maxsize=None)
+def get_sos_ingest():
+    init_firebase()
+    return SosIngest(db.reference("SOSMessages"))
+
+
+# Every SOS message as a DataFrame; each poll downloads only the new ones
+def load_sos():
+    return get_sos_ingest().refresh()
+
+
+# Spatial index over the SOS messages, keyed by Firebase push key
+def get_sos_index():
+    return get_sos_ingest().index
+
+
+# --------------------------------------------- REFRESHER ---------------------------------------------
+
+# Started once per server process and shared by every session
+@st.cache_resource
+def get_refresher():
+    refresher = Refresher()
+    refresher.register("gdacs", load_gdacs, _interval("gdacs"))
+    for query in NEWS_QUERIES:
+        refresher.register(news_source(query), partial(load_news, query), _interval("news"))
+    refresher.register("donations", load_donations, _interval("donations"))
+    refresher.register("top_donations", load_top_donations, _interval("top_donations"))
+    refresher.register("donation_queue", partial(flush_donations, refresher), _interval("donation_queue"))
+    refresher.register("sos", load_sos, _interval("sos"), version=sos_version)
+    refresher.start()
+    return refresher
+
+
+def get_snapshot(name):
+    return get_refresher().store.get(name)
+
+
+# GDACS feed and its version from the snapshot, falling back to the GeoJSON
+# file on disk until the first background refresh has completed
+def get_gdacs():
+    snapshot = get_snapshot("gdacs")
+    if snapshot.ready:
+        return snapshot.data, snapshot.version
+    if os.path.exists(GEOJSON_FILEPATH):
+        with open(GEOJSON_FILEPATH, 'r') as f:
+            data = json.load(f)
+        return data, data_version(data)
+    return {}, None
+
+
+# Lazily paged articles for a query. Pre-fetched queries start from the
+# snapshot and fetch nothing until the reader pages past it (nothing at all
+# while the first refresh is pending); anything else is a user search and its
+# first page is fetched inline.
+def latest_news(query):
+    name = news_source(query)
+    if get_refresher().is_registered(name):
+        snapshot = get_snapshot(name)
+        return ArticleFeed(get_news_client(), query, first=snapshot.data, more=snapshot.ready)
+    return ArticleFeed(get_news_client(), query)
+
+
+def format_age(seconds):
+    if seconds < 60:
+        return f"{int(seconds)}s"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} min"
+    return f"{seconds / 3600:.1f} h"
+
+
+# Tell the user how old a snapshot is, or that it is still loading
+def show_freshness(name):
+    snapshot = get_snapshot(name)
+    if not snapshot.ready:
+        if snapshot.failures:
+            st.error(f"Could not load {name} data: {snapshot.last_error}")
+        else:
+            st.info(f"Loading {name} data in the background, refresh in a moment.")
+    elif snapshot.failures or snapshot.is_stale(2 * _interval(name)):
+        st.warning(
+            f"Showing {name} data from {format_age(snapshot.age())} ago "
+            f"({snapshot.failures} failed refreshes: {snapshot.last_error})"
+        )
+    else:
+        st.caption(f"Updated {format_age(snapshot.age())} ago")
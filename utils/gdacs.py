@@ -0,0 +1,130 @@
+import argparse
+import json
+import os
+import time
+
+import requests
+
+from utils.config import atomic_write
+
+# GDACS event list API, same feed the Alerts page exports through downloadResult()
+GDACS_FEED_URL = os.environ.get(
+    "GDACS_FEED_URL", "https://www.gdacs.org/gdacsapi/api/events/geteventlist/MAP"
+)
+
+# Recorded response to replay instead of hitting the network (offline runs / tests)
+GDACS_FIXTURE = os.environ.get("GDACS_FIXTURE")
+
+# Seconds between background refreshes of the feed
+GDACS_TTL = int(os.environ.get("GDACS_TTL", 15 * 60))
+
+REQUEST_TIMEOUT = (5, 30)  # (connect, read) seconds
+
+
+class FeedResponse:
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+
+# Sidecar file keeping the validators and fetch time of the local copy
+def meta_path(filepath):
+    return filepath + ".meta.json"
+
+
+def read_meta(filepath):
+    try:
+        with open(meta_path(filepath), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_meta(filepath, meta):
+    atomic_write(meta_path(filepath), json.dumps(meta).encode("utf-8"))
+
+
+# Replay a recorded response, honouring the conditional request headers
+def _fixture_response(fixture_path, headers):
+    with open(fixture_path, "r") as f:
+        recorded = json.load(f)
+    recorded_headers = recorded.get("headers", {})
+    etag = recorded_headers.get("ETag")
+    if etag and headers.get("If-None-Match") == etag:
+        return FeedResponse(304, recorded_headers, b"")
+    body = json.dumps(recorded["body"]).encode("utf-8")
+    return FeedResponse(recorded.get("status", 200), recorded_headers, body)
+
+
+def _get(url, headers, session=None, fixture=None):
+    if fixture:
+        return _fixture_response(fixture, headers)
+    response = (session or requests).get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    return FeedResponse(response.status_code, response.headers, response.content)
+
+
+# Download the feed with a conditional GET. Returns True when the local file
+# changed, False when the server answered 304 Not Modified.
+def fetch_feed(filepath, url=GDACS_FEED_URL, session=None, fixture=GDACS_FIXTURE):
+    meta = read_meta(filepath) if os.path.exists(filepath) else {}
+    headers = {"Accept": "application/geo+json, application/json"}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = _get(url, headers, session=session, fixture=fixture)
+
+    if response.status_code == 304:
+        meta["fetched_at"] = time.time()
+        write_meta(filepath, meta)
+        return False
+    if response.status_code != 200:
+        raise requests.HTTPError(f"GDACS feed returned HTTP {response.status_code}")
+
+    # Refuse to replace a good copy with something that is not GeoJSON
+    data = json.loads(response.content)
+    if "features" not in data:
+        raise ValueError("GDACS feed response has no 'features'")
+
+    atomic_write(filepath, response.content)
+    write_meta(filepath, {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "fetched_at": time.time(),
+        "url": url,
+    })
+    return True
+
+
+# Save a live response as a fixture that GDACS_FIXTURE can replay later
+def record_fixture(fixture_path, url=GDACS_FEED_URL):
+    response = requests.get(url, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    recorded = {
+        "status": response.status_code,
+        "headers": {
+            key: response.headers[key]
+            for key in ("ETag", "Last-Modified", "Content-Type")
+            if key in response.headers
+        },
+        "body": response.json(),
+    }
+    atomic_write(fixture_path, json.dumps(recorded).encode("utf-8"))
+
+
+# python -m utils.gdacs record tests/fixtures/gdacs_feed.json
+def main():
+    parser = argparse.ArgumentParser(description="GDACS feed tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="save the live feed as a GDACS_FIXTURE file")
+    record.add_argument("fixture_path")
+    record.add_argument("--url", default=GDACS_FEED_URL)
+    args = parser.parse_args()
+    if args.command == "record":
+        record_fixture(args.fixture_path, url=args.url)
+
+
+if __name__ == "__main__":
+    main()
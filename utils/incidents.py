@@ -0,0 +1,110 @@
+import glob
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+
+from utils.config import atomic_write, cache_path
+
+INCIDENTS_CSV = "datasets/California_Fire_Incidents.csv"
+
+# Explicit column types, so the CSV is parsed once the same way everywhere.
+# Counts are float32 because missing values must stay NaN; repeated labels
+# are categorical.
+INCIDENT_DTYPES = {
+    "AcresBurned": np.float64,
+    "AdminUnit": "category",
+    "AirTankers": np.float32,
+    "ArchiveYear": np.int16,
+    "CalFireIncident": bool,
+    "Counties": "category",
+    "CountyIds": "category",
+    "CrewsInvolved": np.float32,
+    "Dozers": np.float32,
+    "Engines": np.float32,
+    "Fatalities": np.float32,
+    "FuelType": "category",
+    "Helicopters": np.float32,
+    "Injuries": np.float32,
+    "Latitude": np.float64,
+    "Longitude": np.float64,
+    "MajorIncident": bool,
+    "PercentContained": np.float32,
+    "PersonnelInvolved": np.float32,
+    "Status": "category",
+    "StructuresDamaged": np.float32,
+    "StructuresDestroyed": np.float32,
+    "StructuresEvacuated": np.float32,
+    "StructuresThreatened": np.float32,
+    "WaterTenders": np.float32,
+}
+INCIDENT_DATES = ["Started", "Extinguished", "Updated"]
+
+
+def read_incidents_csv(path=INCIDENTS_CSV):
+    frame = pd.read_csv(path, dtype=INCIDENT_DTYPES)
+    for column in INCIDENT_DATES:
+        frame[column] = pd.to_datetime(frame[column], utc=True, errors="coerce")
+    return frame
+
+
+# Convert the CSV to an uncompressed Arrow IPC file once per source version.
+# The file name carries the source mtime, so an edited CSV gets a fresh
+# conversion and older ones are removed.
+def convert_incidents(path=INCIDENTS_CSV):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    target = cache_path("incidents", f"{stem}-{os.stat(path).st_mtime_ns}.arrow")
+    if os.path.exists(target):
+        return target
+
+    table = pa.Table.from_pandas(read_incidents_csv(path), preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    atomic_write(target, sink.getvalue().to_pybytes())
+    for stale in glob.glob(cache_path("incidents", f"{stem}-*.arrow")):
+        if stale != target:
+            try:
+                os.remove(stale)
+            except OSError:  # still mapped by a reader on Windows
+                pass
+    return target
+
+
+# Incident columns over a memory-mapped Arrow table. Columns are converted to
+# pandas on first use and kept, so charts read only what they plot.
+class IncidentStore:
+    def __init__(self, path):
+        self.path = path
+        self.table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        self._columns = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.table.num_rows
+
+    @property
+    def column_names(self):
+        return self.table.column_names
+
+    def column(self, name):
+        with self._lock:
+            if name not in self._columns:
+                self._columns[name] = self.table.column(name).to_pandas().rename(name)
+            return self._columns[name]
+
+    def frame(self, columns):
+        return pd.concat([self.column(name) for name in columns], axis=1)
+
+
+# Shared by every session; a new source mtime is a new cache key
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_incident_store(path, mtime_ns):
+    return IncidentStore(convert_incidents(path))
+
+
+def get_incident_store(path=INCIDENTS_CSV):
+    return load_incident_store(path, os.stat(path).st_mtime_ns)
@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from pypdf import PdfReader
+
+from utils.corpus import content_hash
+
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", max((os.cpu_count() or 2) - 1, 1)))
+
+# Pages extracted per worker task, and tasks in flight per worker; together
+# they bound how much extracted text waits in memory
+PAGES_PER_TASK = 8
+TASKS_PER_WORKER = 2
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+
+
+# Runs in a worker process: text of pages [start, stop) as (page, text)
+def extract_pages(path, start, stop):
+    reader = PdfReader(path)
+    return [(number, reader.pages[number].extract_text() or "") for number in range(start, stop)]
+
+
+# Process pool shared by every ingest in this server. Workers are spawned,
+# not forked, since the Streamlit process runs many threads.
+@lru_cache(maxsize=None)
+def get_ingest_pool():
+    return ProcessPoolExecutor(max_workers=INGEST_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+
+# (page, text) for every page in order, extracted in the process pool with
+# at most workers * TASKS_PER_WORKER tasks outstanding
+def iter_pages(path, page_count, pool=None):
+    pool = pool or get_ingest_pool()
+    ranges = iter([(start, min(start + PAGES_PER_TASK, page_count)) for start in range(0, page_count, PAGES_PER_TASK)])
+    pending = deque()
+    for start, stop in ranges:
+        pending.append(pool.submit(extract_pages, path, start, stop))
+        if len(pending) >= INGEST_WORKERS * TASKS_PER_WORKER:
+            break
+    while pending:
+        yield from pending.popleft().result()
+        next_range = next(ranges, None)
+        if next_range:
+            pending.append(pool.submit(extract_pages, path, *next_range))
+
+
+# Chunks of a PDF as its pages arrive, each {"text", "metadata"} with the
+# 0-based page number. progress(done, total) is called after every page.
+def iter_chunks(path, name, progress=None, pool=None):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    page_count = len(PdfReader(path).pages)
+    for number, text in iter_pages(path, page_count, pool):
+        for piece in splitter.split_text(text):
+            yield {"text": piece, "metadata": {"source": name, "page": number}}
+        if progress:
+            progress(number + 1, page_count)
+
+
+# Corpus id of an upload: the file name plus a prefix of its content hash, so
+# unrelated files that share a name never overwrite each other
+def document_id(name, data):
+    return f"{name}:{content_hash(data)[:16]}"
+
+
+# Add a PDF, given as bytes, to the corpus under doc_id. Pages are extracted
+# in parallel, split as they arrive and embedded in batches, so memory tracks
+# the batch size rather than the document, and the corpus stays writable by
+# other sessions until the final swap. Unchanged content is skipped without
+# being read. Documents in `replaces` are swapped out in the same step. The
+# temporary copy the workers read is always removed.
+def ingest_pdf(corpus, doc_id, name, data, progress=None, replaces=()):
+    key = content_hash(data)
+    document = corpus.document(doc_id)
+    if document and document["content_hash"] == key:
+        return corpus.add_document(doc_id, name, key, (), replaces=replaces)
+
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return corpus.add_document(doc_id, name, key, iter_chunks(path, name, progress), replaces=replaces)
+    finally:
+        os.remove(path)
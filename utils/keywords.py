@@ -0,0 +1,148 @@
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+# utils.nlu is imported inside the NLU-backed methods so the local backend
+# works without ibm-watson installed
+
+# "local" (in-process RAKE), "watson" (NLU only) or "tiered" (local first,
+# refined by NLU in the background)
+KEYWORD_BACKEND = os.environ.get("KEYWORD_BACKEND", "tiered")
+
+MAX_PHRASE_WORDS = 3
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further had has
+have having he her here hers herself him himself his how i if in into is it its itself just me more
+most my myself no nor not now of off on once only or other our ours ourselves out over own said same
+says she should so some such than that the their theirs them themselves then there these they this
+those through to too under until up very was we were what when where which while who whom why will
+with would you your yours yourself yourselves new one two us like get got via per since amid
+""".split())
+
+# Phrase boundaries: punctuation, and any run of characters that is not part of a word
+BOUNDARY_RE = re.compile(r"[.,;:!?()\[\]{}\"“”‘’|/\\]+|\s[-–—]+\s|\n")
+WORD_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9'&\-]*")
+
+
+# Interface shared by every keyword backend: one result per input text, in
+# order, each a list of keywords or the exception that text raised
+class KeywordBackend(ABC):
+    name = "base"
+
+    @abstractmethod
+    def extract(self, texts, limit=5):
+        pass
+
+
+# RAKE: candidate phrases are runs of non-stopwords; each word scores
+# degree / frequency over the text and a phrase scores the sum of its words
+def rake_keywords(text, limit=5):
+    phrases = []
+    for fragment in BOUNDARY_RE.split(text):
+        phrase = []
+        for word in WORD_RE.findall(fragment):
+            if word.lower() in STOPWORDS or word.isdigit():
+                if phrase:
+                    phrases.append(phrase)
+                phrase = []
+            else:
+                phrase.append(word)
+        if phrase:
+            phrases.append(phrase)
+
+    frequency = defaultdict(int)
+    degree = defaultdict(int)
+    for phrase in phrases:
+        phrase = phrase[:MAX_PHRASE_WORDS]
+        for word in phrase:
+            frequency[word.lower()] += 1
+            degree[word.lower()] += len(phrase)
+
+    scores = {}
+    original = {}
+    for phrase in phrases:
+        phrase = phrase[:MAX_PHRASE_WORDS]
+        key = " ".join(word.lower() for word in phrase)
+        if key in scores:
+            continue
+        scores[key] = sum(degree[word.lower()] / frequency[word.lower()] for word in phrase)
+        original[key] = " ".join(phrase)
+    ranked = sorted(scores, key=lambda key: (-scores[key], key))
+    return [original[key] for key in ranked[:limit]]
+
+
+class LocalKeywordBackend(KeywordBackend):
+    name = "local"
+
+    def extract(self, texts, limit=5):
+        return [rake_keywords(text, limit) for text in texts]
+
+
+class WatsonKeywordBackend(KeywordBackend):
+    name = "watson"
+
+    def extract(self, texts, limit=5):
+        from utils.nlu import extract_keywords_batch
+
+        return extract_keywords_batch(texts, limit=limit)
+
+
+# Answers immediately: NLU keywords when the persistent NLU cache already has
+# the text, local keywords otherwise. Texts answered locally are sent to NLU
+# on a background pool so the next render gets the refined result.
+class TieredKeywordBackend(KeywordBackend):
+    name = "tiered"
+
+    def __init__(self, local=None, refine_workers=2):
+        self.local = local or LocalKeywordBackend()
+        self._pool = ThreadPoolExecutor(max_workers=refine_workers, thread_name_prefix="keyword-refine")
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    # `texts` were just missed in the cache by extract, so they go straight to NLU
+    def _refine(self, texts, limit):
+        from utils.nlu import extract_uncached_keywords
+
+        try:
+            extract_uncached_keywords(texts, limit=limit)
+        finally:
+            with self._lock:
+                self._in_flight.difference_update(texts)
+
+    def extract(self, texts, limit=5):
+        texts = list(texts)
+        try:
+            from utils.nlu import cached_keywords
+
+            refined = cached_keywords(texts, limit=limit)
+        except Exception:
+            refined = [None] * len(texts)
+        missing = [text for text, keywords in zip(texts, refined) if keywords is None]
+        local = iter(self.local.extract(missing, limit))
+
+        with self._lock:
+            to_refine = [text for text in dict.fromkeys(missing) if text not in self._in_flight]
+            self._in_flight.update(to_refine)
+        if to_refine:
+            self._pool.submit(self._refine, to_refine, limit)
+
+        return [keywords if keywords is not None else next(local) for keywords in refined]
+
+
+BACKENDS = {
+    "local": LocalKeywordBackend,
+    "watson": WatsonKeywordBackend,
+    "tiered": TieredKeywordBackend,
+}
+
+
+# One backend instance per process
+@lru_cache(maxsize=None)
+def get_keyword_backend(name=KEYWORD_BACKEND):
+    return BACKENDS[name]()
@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+import numpy as np
+
+from utils.config import get_secret
+
+LLM_MODEL = os.environ.get("LLM_MODEL", "meta-llama/Llama-3.2-1B-Instruct")
+
+# OpenAI-compatible endpoint to use instead of the Hugging Face Inference API,
+# e.g. a TGI/vLLM server or benchmarks/mock_inference_server.py
+LLM_BASE_URL = os.environ.get("LLM_BASE_URL")
+
+GENERATION_PARAMS = {"max_tokens": 512, "temperature": 0.01, "top_p": 0.9}
+
+# Requests kept per latency window
+LATENCY_WINDOW = 500
+
+
+# One inference client per process; its HTTP connections are reused across
+# turns, sessions and threads
+@lru_cache(maxsize=None)
+def get_inference_client():
+    from huggingface_hub import InferenceClient
+
+    if LLM_BASE_URL:
+        return InferenceClient(base_url=LLM_BASE_URL, api_key=os.environ.get("HF_TOKEN") or "-")
+    return InferenceClient(api_key=get_secret("HF_TOKEN"))
+
+
+# Rolling time-to-first-token and total latency per request kind
+class LatencyStats:
+    def __init__(self, window=LATENCY_WINDOW):
+        self._samples = {}
+        self._window = window
+        self._lock = threading.Lock()
+
+    def record(self, kind, ttft, total):
+        with self._lock:
+            self._samples.setdefault(kind, deque(maxlen=self._window)).append((ttft, total))
+
+    def summary(self):
+        with self._lock:
+            samples = {kind: list(values) for kind, values in self._samples.items()}
+        summary = {}
+        for kind, values in samples.items():
+            ttft = np.array([ttft for ttft, _ in values if ttft is not None])
+            total = np.array([total for _, total in values])
+            summary[kind] = {
+                "requests": len(values),
+                "ttft_p50": float(np.percentile(ttft, 50)) if len(ttft) else None,
+                "ttft_p95": float(np.percentile(ttft, 95)) if len(ttft) else None,
+                "total_p50": float(np.percentile(total, 50)),
+                "total_p95": float(np.percentile(total, 95)),
+            }
+        return summary
+
+
+@lru_cache(maxsize=None)
+def get_latency_stats():
+    return LatencyStats()
+
+
+# Timing of one streamed answer, filled in while it is consumed
+class StreamTiming:
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.ttft = None
+        self.total = None
+
+
+# Stream the text of a chat completion, recording time to first token and
+# total time under `kind`. Passing a StreamTiming started earlier counts work
+# done before the request, such as retrieval, in the time to first token.
+def stream_chat(messages, kind="chat", timing=None, client=None, model=LLM_MODEL, **params):
+    timing = timing or StreamTiming()
+    client = client or get_inference_client()
+    stream = client.chat.completions.create(
+        model=model, messages=messages, stream=True, **{**GENERATION_PARAMS, **params}
+    )
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                if timing.ttft is None:
+                    timing.ttft = time.perf_counter() - timing.started
+                yield chunk.choices[0].delta.content
+    finally:
+        timing.total = time.perf_counter() - timing.started
+        get_latency_stats().record(kind, timing.ttft, timing.total)
@@ -0,0 +1,147 @@
+import html
+import os
+
+import folium
+import pandas as pd
+import streamlit as st
+import streamlit.components.v1 as components
+from folium.plugins import FastMarkerCluster
+
+from utils.events import GDACS_DATE_FORMAT
+
+# "cluster" emits one clustered point layer plus one GeoJSON polygon layer,
+# "markers" is the original one-folium.Marker-per-event rendering
+MAP_RENDER_MODE = os.environ.get("MAP_RENDER_MODE", "cluster")
+
+# Named starting views, (center, zoom)
+VIEWPORTS = {
+    "world": ([20.0, 0.0], 2),
+    "usa": ([37.0902, -100.7129], 3.5),
+}
+
+ALERT_COLORS = {"Green": "#2e8b57", "Orange": "#ff8c00", "Red": "#d62728"}
+
+POLYGON_TYPES = ("Polygon", "MultiPolygon")
+
+# Builds the popup in the browser when a marker is opened, from the row that
+# FastMarkerCluster ships to the client: [lat, lon, name, description, date, url]
+LAZY_POPUP_CALLBACK = """
+function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]));
+    marker.bindPopup(function () {
+        var div = document.createElement('div');
+        div.appendChild(document.createTextNode(row[2] + ': ' + row[3]));
+        div.appendChild(document.createElement('br'));
+        div.appendChild(document.createTextNode('Date: ' + row[4]));
+        if (row[5]) {
+            var link = document.createElement('a');
+            link.href = row[5];
+            link.target = '_blank';
+            link.textContent = 'More Info';
+            div.appendChild(document.createElement('br'));
+            div.appendChild(link);
+        }
+        return div;
+    });
+    return marker;
+}
+"""
+
+
+def _format_date(value):
+    return value.strftime(GDACS_DATE_FORMAT) if not pd.isna(value) else ''
+
+
+def event_popup_html(event):
+    title = html.escape(str(event.eventname))
+    description = html.escape(str(event.description))
+    fromdate = _format_date(event.fromdate)
+    if event.report_url:
+        return f"{title}: {description}<br>Date: {fromdate}<br><a href='{html.escape(event.report_url)}' target='_blank'>More Info</a>"
+    return f"{title}: {description}<br>Date: {fromdate}"
+
+
+# One folium.Marker with a pre-rendered popup per point event
+def add_event_markers(m, events):
+    points = events[(events['geometry'] == 'Point') & events['lat'].notna()]
+    for event in points.itertuples(index=False):
+        folium.Marker([event.lat, event.lon], popup=event_popup_html(event)).add_to(m)
+
+
+# All point events as one client-side cluster layer with lazy popups
+def add_event_clusters(m, events):
+    points = events[(events['geometry'] == 'Point') & events['lat'].notna()]
+    if points.empty:
+        return
+    rows = list(zip(
+        points['lat'].round(5).tolist(),
+        points['lon'].round(5).tolist(),
+        points['eventname'].fillna('').tolist(),
+        points['description'].fillna('').tolist(),
+        [_format_date(value) for value in points['fromdate']],
+        points['report_url'].tolist(),
+    ))
+    FastMarkerCluster(rows, callback=LAZY_POPUP_CALLBACK, name="Disaster events").add_to(m)
+
+
+# Polygon events as a single GeoJSON layer, coloured by alert level. Only the
+# fields the popup needs are copied into the layer.
+def add_event_polygons(m, events, features):
+    shapes = events[events['geometry'].isin(POLYGON_TYPES)]
+    if shapes.empty:
+        return
+    collection = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": features[event.feature]["geometry"],
+                "properties": {
+                    "eventname": event.eventname,
+                    "description": event.description,
+                    "fromdate": _format_date(event.fromdate),
+                    "alertlevel": str(event.alertlevel),
+                },
+            }
+            for event in shapes.itertuples(index=False)
+        ],
+    }
+    folium.GeoJson(
+        collection,
+        name="Affected areas",
+        style_function=lambda feature: {
+            "color": ALERT_COLORS.get(feature["properties"]["alertlevel"], "#3388ff"),
+            "weight": 1,
+            "fillOpacity": 0.25,
+        },
+        popup=folium.GeoJsonPopup(
+            fields=["eventname", "description", "fromdate"],
+            aliases=["Event", "Description", "Date"],
+        ),
+    ).add_to(m)
+
+
+def plot_disaster_events(m, events, features=(), mode=MAP_RENDER_MODE):
+    if mode == "markers":
+        add_event_markers(m, events)
+        return
+    add_event_polygons(m, events, features)
+    add_event_clusters(m, events)
+
+
+def new_map(viewport):
+    location, zoom_start = VIEWPORTS[viewport]
+    return folium.Map(location=location, zoom_start=zoom_start)
+
+
+# Rendered map HTML shared by every rerun and session. The key is the data
+# snapshot version, the viewport and the layer set, so an entry is only
+# replaced once the snapshot behind it changes; `_build` (not hashed) returns
+# the folium.Map to render on a miss.
+@st.cache_resource(max_entries=32, show_spinner=False)
+def cached_map_html(data_version, viewport, layers, _build):
+    return _build().get_root().render()
+
+
+def show_map(map_html, height=500):
+    components.html(map_html, height=height)
@@ -0,0 +1,219 @@
+import logging
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.config import get_secret
+
+logger = logging.getLogger(__name__)
+
+NEWS_API_URL = "https://newsapi.org/v2/everything"
+
+# Seconds a NewsAPI page is served from the shared cache
+NEWS_CACHE_TTL = int(os.environ.get("NEWS_CACHE_TTL", 15 * 60))
+NEWS_CACHE_MAX_ENTRIES = 256
+
+NEWS_PAGE_SIZE = 20
+REQUEST_TIMEOUT = (5, 20)  # (connect, read) seconds
+
+# Titles whose word-shingle Jaccard similarity reaches this are the same story
+TITLE_SIMILARITY = 0.7
+
+TRACKING_PARAMS = re.compile(r"^(utm_.*|fbclid|gclid|cmpid|ocid|mc_cid|mc_eid|ref|src|source)$", re.I)
+TITLE_SOURCE_SUFFIX = re.compile(r"\s+[-|–—]\s+[^-|–—]{2,60}$")
+TITLE_WORD = re.compile(r"[a-z0-9]+")
+
+
+class NewsApiError(Exception):
+    pass
+
+
+# Lower-case, trimmed and whitespace-collapsed, so "LA  fires" and "la fires"
+# share one cache entry
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+# Same article under different tracking parameters, schemes or hosts with www
+def canonical_url(url):
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query) if not TRACKING_PARAMS.match(key)
+    ))
+    return urlunsplit(("", host, parts.path.rstrip("/"), query, ""))
+
+
+# Word bigram shingles of a title with the trailing " - Source" removed
+def title_shingles(title):
+    words = TITLE_WORD.findall(TITLE_SOURCE_SUFFIX.sub("", title or "").lower())
+    if len(words) < 2:
+        return set(words)
+    return {(a, b) for a, b in zip(words, words[1:])}
+
+
+def _similar(a, b):
+    if not a or not b:
+        return False
+    return len(a & b) / len(a | b) >= TITLE_SIMILARITY
+
+
+# Drop repeats of a story already yielded, by canonical URL or near-identical title
+def dedupe_articles(articles):
+    seen_urls = set()
+    seen_titles = []
+    for article in articles:
+        url = canonical_url(article.get("url"))
+        if url and url in seen_urls:
+            continue
+        shingles = title_shingles(article.get("title"))
+        if any(_similar(shingles, seen) for seen in seen_titles):
+            continue
+        seen_urls.add(url)
+        seen_titles.append(shingles)
+        yield article
+
+
+# Pooled NewsAPI client with a TTL cache shared by every page and session
+class NewsClient:
+    def __init__(self, api_key, session=None, ttl=NEWS_CACHE_TTL, page_size=NEWS_PAGE_SIZE):
+        self.api_key = api_key
+        self.ttl = ttl
+        self.page_size = page_size
+        self.session = session or self._session()
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _session():
+        session = requests.Session()
+        retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+        session.mount("https://", adapter)
+        return session
+
+    def _cached(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry and entry[0] > time.time():
+                return entry[1]
+        return None
+
+    def _store(self, key, payload):
+        with self._lock:
+            if len(self._cache) >= NEWS_CACHE_MAX_ENTRIES:
+                now = time.time()
+                for stale in [k for k, (expires, _) in self._cache.items() if expires <= now]:
+                    del self._cache[stale]
+                while len(self._cache) >= NEWS_CACHE_MAX_ENTRIES:
+                    del self._cache[min(self._cache, key=lambda k: self._cache[k][0])]
+            self._cache[key] = (time.time() + self.ttl, payload)
+
+    def fetch_page(self, query, page=1):
+        key = (normalize_query(query), page, self.page_size)
+        payload = self._cached(key)
+        if payload is not None:
+            return payload
+        response = self.session.get(
+            NEWS_API_URL,
+            params={"q": key[0], "page": page, "pageSize": self.page_size, "sortBy": "publishedAt"},
+            headers={"X-Api-Key": self.api_key},
+            timeout=REQUEST_TIMEOUT
+        )
+        # NewsAPI reports its own errors (bad key, rate limit, result cap) as
+        # JSON with a 4xx status; a 5xx or non-JSON body is an HTTP failure
+        if response.status_code >= 500 or "json" not in response.headers.get("Content-Type", ""):
+            response.raise_for_status()
+        try:
+            payload = response.json()
+        except ValueError:
+            raise NewsApiError(f"NewsAPI returned a non-JSON response (HTTP {response.status_code})")
+        if payload.get("status") != "ok":
+            raise NewsApiError(f"{payload.get('code')}: {payload.get('message')}")
+        self._store(key, payload)
+        return payload
+
+    # Articles for a query, deduplicated, fetching the next page only when the
+    # caller iterates past the current one
+    def iter_articles(self, query):
+        def pages():
+            page = 1
+            while True:
+                try:
+                    payload = self.fetch_page(query, page)
+                except NewsApiError as e:
+                    # Past the end of the results the account may page through
+                    if page > 1 and "maximumResultsReached" in str(e):
+                        return
+                    raise
+                articles = payload.get("articles", [])
+                yield from articles
+                if not articles or page * self.page_size >= payload.get("totalResults", 0):
+                    return
+                page += 1
+
+        return dedupe_articles(pages())
+
+    def search(self, query, limit=NEWS_PAGE_SIZE):
+        articles = []
+        for article in self.iter_articles(query):
+            articles.append(article)
+            if len(articles) >= limit:
+                break
+        return articles
+
+
+# Articles of one query for a reader that shows them a few at a time: pages
+# are fetched only when the reader asks past what it already has. `first`
+# seeds it with articles already fetched (the refresher's first page); later
+# pages skip any of those by canonical URL.
+class ArticleFeed:
+    def __init__(self, client, query, first=None, more=True):
+        self.query = query
+        self.articles = list(first or [])
+        self._seen = {canonical_url(article.get("url")) for article in self.articles}
+        self._pages = client.iter_articles(query) if more else iter(())
+        self._lock = threading.Lock()
+
+    def head(self, n):
+        with self._lock:
+            while len(self.articles) < n:
+                try:
+                    article = next(self._pages, None)
+                except (requests.RequestException, NewsApiError) as e:
+                    # Keep showing what was fetched; the first page still raises
+                    if not self.articles:
+                        raise
+                    logger.warning("Stopped paging news for %r: %s", self.query, e)
+                    self._pages = iter(())
+                    break
+                if article is None:
+                    break
+                url = canonical_url(article.get("url"))
+                if url and url in self._seen:
+                    continue
+                self._seen.add(url)
+                self.articles.append(article)
+            return self.articles[:n]
+
+    def has_more(self, n):
+        return len(self.head(n + 1)) > n
+
+    def __bool__(self):
+        return bool(self.head(1))
+
+
+@lru_cache(maxsize=None)
+def get_news_client():
+    return NewsClient(get_secret("NEWS_API_KEY"))
@@ -0,0 +1,129 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from ibm_cloud_sdk_core import ApiException
+from ibm_cloud_sdk_core.authenticators import IAMAuthenticator
+from ibm_watson import NaturalLanguageUnderstandingV1
+from ibm_watson.natural_language_understanding_v1 import Features, KeywordsOptions
+
+from utils.config import get_secret
+from utils.nlu_cache import NluCache, cache_key
+
+# Concurrent NLU calls per batch
+NLU_MAX_WORKERS = 4
+
+# Retries for rate-limited (429) and temporarily unavailable (5xx) responses
+NLU_MAX_RETRIES = 4
+NLU_BACKOFF_SECONDS = 1.0
+
+# Longest single wait, whatever the server's Retry-After asks for
+NLU_BACKOFF_MAX = 30.0
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+# One NLU client per process, shared by every session and worker thread
+@lru_cache(maxsize=None)
+def get_nlu_client():
+    nlu = NaturalLanguageUnderstandingV1(
+        version="2021-08-01",
+        authenticator=IAMAuthenticator(get_secret("NLU_API_KEY"))
+    )
+    nlu.set_service_url(get_secret("NLU_URL"))
+    return nlu
+
+
+@lru_cache(maxsize=None)
+def get_nlu_cache():
+    return NluCache()
+
+
+def keyword_features(limit):
+    return {"keywords": {"limit": limit, "emotion": False, "sentiment": False}}
+
+
+def _retry_delay(error, attempt):
+    retry_after = None
+    if error.http_response is not None:
+        retry_after = error.http_response.headers.get("Retry-After")
+    try:
+        delay = float(retry_after)
+    except (TypeError, ValueError):
+        delay = NLU_BACKOFF_SECONDS * 2 ** attempt * (1 + random.random())
+    return min(max(delay, 0.0), NLU_BACKOFF_MAX)
+
+
+# Top keywords for one text, backing off on rate limits
+def extract_keywords(text, limit=5, nlu=None):
+    nlu = nlu or get_nlu_client()
+    for attempt in range(NLU_MAX_RETRIES + 1):
+        try:
+            response = nlu.analyze(
+                text=text,
+                features=Features(
+                    keywords=KeywordsOptions(emotion=False, sentiment=False, limit=limit)
+                )
+            ).get_result()
+            return [keyword["text"] for keyword in response["keywords"]]
+        except ApiException as e:
+            if e.status_code not in RETRYABLE_STATUS or attempt == NLU_MAX_RETRIES:
+                raise
+            time.sleep(_retry_delay(e, attempt))
+
+
+def _extract_or_error(text, limit, nlu):
+    try:
+        return extract_keywords(text, limit=limit, nlu=nlu)
+    except Exception as e:
+        return e
+
+
+# Cached keywords for each text, None where NLU has not seen the text yet
+def cached_keywords(texts, limit=5, cache=None):
+    cache = cache or get_nlu_cache()
+    keys = [cache_key(text, keyword_features(limit)) for text in texts]
+    cached = cache.get_many(keys)
+    return [cached.get(key) for key in keys]
+
+
+# Keywords for texts not taken from the cache, keyed by cache key. Identical
+# texts are sent once, concurrently on a bounded pool; successful results are
+# cached and a failed text maps to its exception.
+def _fetch_keywords(missing, limit, nlu, max_workers, cache):
+    nlu = nlu or get_nlu_client()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as pool:
+        fetched = dict(zip(missing, pool.map(lambda text: _extract_or_error(text, limit, nlu), missing.values())))
+    cache.put_many({key: result for key, result in fetched.items() if not isinstance(result, Exception)})
+    return fetched
+
+
+# Keywords for a batch of texts. Texts already in the persistent cache are
+# answered from it; the rest go to NLU and successful results are cached.
+# Results come back in input order; a failed text yields its exception
+# instead of failing the whole batch.
+def extract_keywords_batch(texts, limit=5, nlu=None, max_workers=NLU_MAX_WORKERS, cache=None):
+    texts = list(texts)
+    if not texts:
+        return []
+    cache = cache or get_nlu_cache()
+    keys = [cache_key(text, keyword_features(limit)) for text in texts]
+    cached = cache.get_many(keys)
+    missing = {key: text for key, text in zip(keys, texts) if key not in cached}
+    if missing:
+        cached.update(_fetch_keywords(missing, limit, nlu, max_workers, cache))
+    return [cached[key] for key in keys]
+
+
+# Same as extract_keywords_batch for texts the caller already looked up with
+# cached_keywords and found missing: the cache is not read again, so each
+# miss is counted once
+def extract_uncached_keywords(texts, limit=5, nlu=None, max_workers=NLU_MAX_WORKERS, cache=None):
+    texts = list(texts)
+    if not texts:
+        return []
+    cache = cache or get_nlu_cache()
+    keys = [cache_key(text, keyword_features(limit)) for text in texts]
+    fetched = _fetch_keywords(dict(zip(keys, texts)), limit, nlu, max_workers, cache)
+    return [fetched[key] for key in keys]
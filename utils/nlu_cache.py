@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from utils.config import cache_path, connect_sqlite
+
+# Total size of cached results before least recently used entries are evicted
+NLU_CACHE_MAX_BYTES = int(os.environ.get("NLU_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+
+
+# Default cache file, looked up when a cache is created so importing this
+# module touches nothing on disk
+def nlu_cache_path():
+    return cache_path("nlu", "cache.sqlite3")
+
+
+NLU_CACHE_SCHEMA = (
+    (
+        "CREATE TABLE IF NOT EXISTS results ("
+        " key TEXT PRIMARY KEY,"
+        " value TEXT NOT NULL,"
+        " size INTEGER NOT NULL,"
+        " last_used REAL NOT NULL)"
+    ),
+    "CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)",
+    "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+)
+
+
+def _connect(path):
+    return connect_sqlite(path, NLU_CACHE_SCHEMA)
+
+
+# Same article text and same requested features give the same key, whatever
+# query, session or process produced it
+def cache_key(text, features):
+    normalized = " ".join(text.split())
+    payload = json.dumps(features, sort_keys=True) + "\0" + normalized
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# On-disk, content-addressed cache of NLU results with size-bounded LRU
+# eviction and persistent hit/miss counters
+class NluCache:
+    def __init__(self, path=None, max_bytes=NLU_CACHE_MAX_BYTES):
+        self.path = path or nlu_cache_path()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _count(self, conn, name, amount):
+        if amount:
+            conn.execute(
+                "INSERT INTO counters VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, amount)
+            )
+
+    # Cached results for many keys at once; missing keys are left out
+    def get_many(self, keys):
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        with self._lock, _connect(self.path) as conn:
+            placeholders = ",".join("?" * len(keys))
+            rows = conn.execute(
+                f"SELECT key, value FROM results WHERE key IN ({placeholders})", keys
+            ).fetchall()
+            found = {key: json.loads(value) for key, value in rows}
+            conn.executemany(
+                "UPDATE results SET last_used = ? WHERE key = ?", [(time.time(), key) for key in found]
+            )
+            self._count(conn, "hits", len(found))
+            self._count(conn, "misses", len(keys) - len(found))
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items):
+        rows = []
+        for key, value in items.items():
+            encoded = json.dumps(value)
+            rows.append((key, encoded, len(encoded.encode("utf-8")), time.time()))
+        if not rows:
+            return
+        with self._lock, _connect(self.path) as conn:
+            conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", rows)
+            self._evict(conn)
+
+    def put(self, key, value):
+        self.put_many({key: value})
+
+    # Drop least recently used entries until the cache fits in max_bytes
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM results ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        self._count(conn, "evictions", evicted)
+
+    def stats(self):
+        with self._lock, _connect(self.path) as conn:
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "evictions": counters.get("evictions", 0),
+            "entries": entries,
+            "bytes": size,
+        }
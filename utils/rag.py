@@ -0,0 +1,43 @@
+from functools import lru_cache
+
+from utils.llm import LLM_MODEL, StreamTiming, stream_chat
+from utils.retrieval import get_hybrid_retriever
+
+# The prompt of LangChain's "stuff" question-answering chain
+RAG_PROMPT = (
+    "Use the following pieces of context to answer the question at the end. If you don't know the answer, "
+    "just say that you don't know, don't try to make up an answer.\n\n{context}\n\nQuestion: {question}\nHelpful Answer:"
+)
+
+# Chunks stuffed into the prompt; hybrid retrieval and reranking make three
+# enough where dense search alone needed four
+RAG_TOP_K = 3
+
+
+# Retrieval-augmented answers over the corpus, streamed token by token. One
+# chain per process; everything that varies per question is an argument.
+class RagChain:
+    def __init__(self, retriever, model=LLM_MODEL, prompt=RAG_PROMPT, k=RAG_TOP_K):
+        self.retriever = retriever
+        self.model = model
+        self.prompt = prompt
+        self.k = k
+
+    def retrieve(self, question, doc_ids=None):
+        return self.retriever.retrieve(question, self.k, doc_ids)
+
+    def messages(self, question, chunks):
+        context = "\n\n".join(chunk["text"] for chunk in chunks)
+        return [{"role": "user", "content": self.prompt.format(context=context, question=question)}]
+
+    # (chunks, token stream); time to first token includes retrieval
+    def stream(self, question, doc_ids=None, timing=None, **params):
+        timing = timing or StreamTiming()
+        chunks = self.retrieve(question, doc_ids)
+        tokens = stream_chat(self.messages(question, chunks), kind="rag", timing=timing, model=self.model, **params)
+        return chunks, tokens
+
+
+@lru_cache(maxsize=None)
+def get_rag_chain():
+    return RagChain(get_hybrid_retriever())
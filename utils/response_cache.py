@@ -0,0 +1,124 @@
+import itertools
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+from utils.corpus import normalized
+from utils.embeddings import get_embedding_backend
+
+# Cosine similarity from which two questions count as the same question
+RESPONSE_CACHE_THRESHOLD = float(os.environ.get("RESPONSE_CACHE_THRESHOLD", 0.92))
+RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", 60 * 60))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 1000))
+
+PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+# "Where are the shelters??" and "where are the shelters" embed the same
+def normalize_question(question):
+    return " ".join(PUNCTUATION.sub(" ", question.lower()).split())
+
+
+# What an answer depends on besides the question: plain chat, or RAG over a
+# given corpus version and document selection. Answers never cross scopes,
+# so any change to the corpus retires the answers built from it.
+def response_scope(corpus_version=None, doc_ids=None):
+    if corpus_version is None:
+        return "chat"
+    return f"rag:{corpus_version}:{','.join(sorted(doc_ids or []))}"
+
+
+class CachedResponse:
+    def __init__(self, question, answer, vector, latency, sources):
+        self.question = question
+        self.answer = answer
+        self.vector = vector
+        self.latency = latency
+        self.sources = sources
+        self.created = time.time()
+
+
+# In-memory semantic cache of LLM answers shared by every session. A question
+# is answered from the cache when an earlier question in the same scope is at
+# least `threshold` similar; entries expire after `ttl` seconds and the least
+# recently used go first once `max_entries` is reached.
+class SemanticCache:
+    def __init__(self, embeddings, threshold=RESPONSE_CACHE_THRESHOLD, ttl=RESPONSE_CACHE_TTL,
+                 max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # id -> (scope, CachedResponse), oldest use first
+        self._matrices = {}  # scope -> (ids, vectors), rebuilt after a change
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def _embed(self, question):
+        return normalized(self.embeddings.embed([normalize_question(question)]))[0]
+
+    def _matrix(self, scope):
+        if scope not in self._matrices:
+            ids = [id_ for id_, (entry_scope, _) in self._entries.items() if entry_scope == scope]
+            vectors = np.vstack([self._entries[id_][1].vector for id_ in ids]) if ids else None
+            self._matrices[scope] = (ids, vectors)
+        return self._matrices[scope]
+
+    def _remove(self, id_):
+        scope, _ = self._entries.pop(id_)
+        self._matrices.pop(scope, None)
+
+    def lookup(self, question, scope):
+        vector = self._embed(question)
+        with self._lock:
+            ids, vectors = self._matrix(scope)
+            if ids:
+                similarities = vectors @ vector
+                best = int(np.argmax(similarities))
+                id_ = ids[best]
+                entry = self._entries[id_][1]
+                if similarities[best] >= self.threshold:
+                    if time.time() - entry.created <= self.ttl:
+                        self._entries.move_to_end(id_)
+                        self.hits += 1
+                        self.saved_seconds += entry.latency
+                        return entry
+                    self._remove(id_)
+            self.misses += 1
+            return None
+
+    # Cache an answer that took `latency` seconds to generate
+    def store(self, question, scope, answer, latency, sources=()):
+        entry = CachedResponse(question, answer, self._embed(question), latency, list(sources))
+        with self._lock:
+            now = time.time()
+            for id_ in [id_ for id_, (_, cached) in self._entries.items() if now - cached.created > self.ttl]:
+                self._remove(id_)
+            while len(self._entries) >= self.max_entries:
+                self._remove(next(iter(self._entries)))
+            self._entries[next(self._ids)] = (scope, entry)
+            self._matrices.pop(scope, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_seconds": self.saved_seconds,
+                "entries": len(self._entries),
+            }
+
+
+@lru_cache(maxsize=None)
+def get_response_cache():
+    return SemanticCache(get_embedding_backend())
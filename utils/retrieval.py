@@ -0,0 +1,203 @@
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+from utils.corpus import get_corpus
+from utils.keywords import STOPWORDS
+
+# Candidates taken from each of BM25 and FAISS before fusion
+CANDIDATES = 20
+
+# Reciprocal-rank fusion constant; larger values flatten the rank curve
+RRF_K = 60
+
+# "lexical" (term coverage, no model) or "cross-encoder" (sentence-transformers)
+RERANKER = os.environ.get("RERANKER", "lexical")
+CROSS_ENCODER_MODEL = os.environ.get("CROSS_ENCODER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Words, numbers and joined codes such as "FF-104" or "555-123-4567"
+TERM_RE = re.compile(r"[a-z0-9]+(?:[-./][a-z0-9]+)*")
+
+
+# Search terms of a text. A joined code is kept whole and also split into its
+# parts, so "555-123-4567" matches a query for "555 123 4567" and vice versa.
+def tokenize(text):
+    terms = []
+    for term in TERM_RE.findall(text.lower()):
+        parts = re.split(r"[-./]", term)
+        if len(parts) > 1:
+            terms.append(term)
+        terms.extend(part for part in parts if part not in STOPWORDS)
+    return terms
+
+
+# Okapi BM25 over an inverted index that chunks are added to and removed from
+# one at a time
+class BM25Index:
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)  # term -> {chunk id: term frequency}
+        self.lengths = {}
+        self.terms = {}  # chunk id -> its distinct terms, for removal
+        self.groups = {}  # chunk id -> doc_id, for filtering
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __contains__(self, id_):
+        return id_ in self.lengths
+
+    def add(self, id_, text, group=None):
+        if id_ in self.lengths:
+            self.remove(id_)
+        terms = Counter(tokenize(text))
+        for term, count in terms.items():
+            self.postings[term][id_] = count
+        self.lengths[id_] = sum(terms.values())
+        self.terms[id_] = tuple(terms)
+        self.groups[id_] = group
+        self.total_length += self.lengths[id_]
+
+    def remove(self, id_):
+        length = self.lengths.pop(id_, None)
+        if length is None:
+            return
+        self.groups.pop(id_, None)
+        self.total_length -= length
+        for term in self.terms.pop(id_):
+            del self.postings[term][id_]
+            if not self.postings[term]:
+                del self.postings[term]
+
+    # (chunk id, score) for the k best matches, optionally only from `groups`
+    def search(self, query, k=CANDIDATES, groups=None):
+        if not self.lengths:
+            return []
+        groups = set(groups) if groups is not None else None
+        n = len(self.lengths)
+        average = self.total_length / n
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            ids = self.postings.get(term)
+            if not ids:
+                continue
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            for id_, tf in ids.items():
+                if groups is not None and self.groups[id_] not in groups:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[id_] / average)
+                scores[id_] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+
+# Merge ranked id lists: each list adds 1 / (RRF_K + rank) to an id's score
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, id_ in enumerate(ranking, start=1):
+            scores[id_] += 1 / (k + rank)
+    return sorted(scores, key=lambda id_: (-scores[id_], id_))
+
+
+# Orders fused candidates by how much of the query each one covers, weighting
+# rare terms (names, numbers, form IDs) by their BM25 idf, with the fused rank
+# as the tie-breaker
+class LexicalReranker:
+    def __init__(self, bm25):
+        self.bm25 = bm25
+
+    def rerank(self, query, chunks):
+        terms = set(tokenize(query))
+        n = max(len(self.bm25), 1)
+        weights = {term: math.log(1 + n / (1 + len(self.bm25.postings.get(term, ())))) for term in terms}
+        total = sum(weights.values()) or 1.0
+
+        def coverage(chunk):
+            present = set(tokenize(chunk["text"]))
+            return sum(weight for term, weight in weights.items() if term in present) / total
+
+        ranked = sorted(enumerate(chunks), key=lambda item: (-coverage(item[1]), item[0]))
+        return [chunk for _, chunk in ranked]
+
+
+class CrossEncoderReranker:
+    def __init__(self, model=CROSS_ENCODER_MODEL):
+        from sentence_transformers import CrossEncoder
+
+        self.model = CrossEncoder(model, device="cpu")
+
+    def rerank(self, query, chunks):
+        if not chunks:
+            return []
+        scores = self.model.predict([(query, chunk["text"]) for chunk in chunks])
+        ranked = sorted(zip(scores, range(len(chunks))), key=lambda item: (-item[0], item[1]))
+        return [chunks[i] for _, i in ranked]
+
+
+# BM25 and FAISS over the same corpus chunks, fused with reciprocal-rank
+# fusion and reranked. The BM25 index follows the corpus incrementally: when
+# the corpus version changes only added and removed chunks are applied.
+class HybridRetriever:
+    def __init__(self, corpus, reranker=RERANKER, candidates=CANDIDATES):
+        self.corpus = corpus
+        self.candidates = candidates
+        self.bm25 = BM25Index()
+        self.reranker = self._reranker(reranker)
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _reranker(self, name):
+        if name == "cross-encoder":
+            try:
+                return CrossEncoderReranker()
+            except ImportError:
+                pass
+        return LexicalReranker(self.bm25) if name else None
+
+    def sync(self):
+        with self._lock:
+            version = self.corpus.version
+            if version == self._version:
+                return
+            current = self.corpus.chunk_ids()
+            for id_ in [id_ for id_ in self.bm25.lengths if id_ not in current]:
+                self.bm25.remove(id_)
+            for chunk in self.corpus.chunks([id_ for id_ in current if id_ not in self.bm25]):
+                self.bm25.add(chunk["id"], chunk["text"], chunk["doc_id"])
+            self._version = version
+
+    def dense(self, query, k, doc_ids=None):
+        return [chunk for chunk, _ in self.corpus.query(query, k, doc_ids)]
+
+    def sparse(self, query, k, doc_ids=None):
+        self.sync()
+        with self._lock:
+            hits = self.bm25.search(query, k, doc_ids)
+        return self.corpus.chunks([id_ for id_, _ in hits])
+
+    # The k chunks to answer from, best first
+    def retrieve(self, query, k, doc_ids=None, rerank=True):
+        dense = self.dense(query, self.candidates, doc_ids)
+        sparse = self.sparse(query, self.candidates, doc_ids)
+        by_id = {chunk["id"]: chunk for chunk in dense + sparse}
+        fused = [by_id[id_] for id_ in reciprocal_rank_fusion([
+            [chunk["id"] for chunk in dense], [chunk["id"] for chunk in sparse]
+        ])]
+        # Chunks found by both searches outrank one that only BM25 ranks first,
+        # so the reranker looks at the whole candidate pool, not just the top k
+        if rerank and self.reranker:
+            fused = self.reranker.rerank(query, fused[:self.candidates])
+        return fused[:k]
+
+
+@lru_cache(maxsize=None)
+def get_hybrid_retriever():
+    return HybridRetriever(get_corpus())
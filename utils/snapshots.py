@@ -0,0 +1,175 @@
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Sources refreshed at the same time; each source has at most one refresh in
+# flight, so a slow feed never holds up the others
+REFRESH_WORKERS = 8
+
+
+# Last good copy of one external feed plus its refresh bookkeeping
+class Snapshot:
+    def __init__(self, name):
+        self.name = name
+        self.data = None
+        self.version = None
+        self.last_success = None  # epoch seconds of the last successful refresh
+        self.last_attempt = None
+        self.failures = 0  # consecutive failed refreshes since the last success
+        self.last_error = None
+
+    @property
+    def ready(self):
+        return self.last_success is not None
+
+    def age(self, now=None):
+        if self.last_success is None:
+            return None
+        return (now or time.time()) - self.last_success
+
+    def is_stale(self, max_age):
+        age = self.age()
+        return age is None or age > max_age
+
+
+# Content hash so an unchanged refresh keeps the same version
+def data_version(data):
+    payload = json.dumps(data, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()[:16]
+
+
+# Thread-safe map of feed name -> Snapshot; reads are a dict lookup. Writers
+# swap in a new Snapshot instead of mutating, so a reader always sees data and
+# version from the same refresh.
+class SnapshotStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots = {}
+
+    def get(self, name):
+        with self._lock:
+            return self._snapshots.get(name) or Snapshot(name)
+
+    def put(self, name, data, version=None):
+        snapshot = Snapshot(name)
+        snapshot.data = data
+        snapshot.version = version or data_version(data)
+        snapshot.last_success = snapshot.last_attempt = time.time()
+        with self._lock:
+            self._snapshots[name] = snapshot
+        return snapshot.version
+
+    def record_failure(self, name, error):
+        with self._lock:
+            previous = self._snapshots.get(name) or Snapshot(name)
+            snapshot = Snapshot(name)
+            snapshot.data = previous.data
+            snapshot.version = previous.version
+            snapshot.last_success = previous.last_success
+            snapshot.last_attempt = time.time()
+            snapshot.failures = previous.failures + 1
+            snapshot.last_error = str(error)
+            self._snapshots[name] = snapshot
+        return snapshot.failures
+
+    def status(self):
+        with self._lock:
+            return {
+                name: {
+                    "version": snapshot.version,
+                    "last_success": snapshot.last_success,
+                    "last_attempt": snapshot.last_attempt,
+                    "failures": snapshot.failures,
+                    "last_error": snapshot.last_error,
+                }
+                for name, snapshot in self._snapshots.items()
+            }
+
+
+class _Source:
+    def __init__(self, name, fetch, interval, version=None):
+        self.name = name
+        self.fetch = fetch
+        self.interval = interval
+        self.version = version
+        self.next_run = 0.0
+        self.running = False
+
+
+# Daemon thread that keeps every registered source warm on its own interval.
+# Due sources run on a worker pool, so a slow fetch does not delay the others.
+# Failures back off exponentially (capped at 8x the interval) and leave the
+# previous snapshot in place.
+class Refresher(threading.Thread):
+    def __init__(self, store=None, workers=REFRESH_WORKERS):
+        super().__init__(name="feed-refresher", daemon=True)
+        self.store = store or SnapshotStore()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="feed-refresh")
+        self._sources = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+
+    # `version`, when given, computes the snapshot version from the fetched
+    # data instead of hashing all of it
+    def register(self, name, fetch, interval, version=None):
+        with self._lock:
+            self._sources[name] = _Source(name, fetch, interval, version)
+        self._wakeup.set()
+
+    def is_registered(self, name):
+        with self._lock:
+            return name in self._sources
+
+    # Schedule a source for the next loop iteration instead of waiting for its interval
+    def refresh_now(self, name):
+        with self._lock:
+            if name in self._sources:
+                self._sources[name].next_run = 0.0
+        self._wakeup.set()
+
+    def refresh_source(self, name):
+        with self._lock:
+            source = self._sources[name]
+        try:
+            data = source.fetch()
+            self.store.put(name, data, source.version(data) if source.version else None)
+            source.next_run = time.time() + source.interval
+        except Exception as e:
+            failures = self.store.record_failure(name, e)
+            source.next_run = time.time() + source.interval * min(2 ** (failures - 1), 8)
+
+    def _run_source(self, name):
+        try:
+            self.refresh_source(name)
+        finally:
+            with self._lock:
+                self._sources[name].running = False
+            self._wakeup.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        self._pool.shutdown(wait=False)
+
+    def run(self):
+        while not self._stopped.is_set():
+            self._wakeup.clear()
+            now = time.time()
+            with self._lock:
+                due = [
+                    source for source in self._sources.values()
+                    if source.next_run <= now and not source.running
+                ]
+                for source in due:
+                    source.running = True
+            for source in due:
+                self._pool.submit(self._run_source, source.name)
+            with self._lock:
+                next_run = min(
+                    (source.next_run for source in self._sources.values() if not source.running),
+                    default=now + 60,
+                )
+            self._wakeup.wait(max(0.0, next_run - time.time()))
@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pandas as pd
+
+from utils.config import cache_path, connect_sqlite
+from utils.spatial import SpatialIndex
+
+# Local copy of every SOS message received from Firebase
+def sos_db_path():
+    return cache_path("sos", "messages.sqlite3")
+
+
+POLL_BATCH_SIZE = 500
+
+SOS_COLUMNS = ["Key", "Latitude", "Longitude", "Message", "ReceivedAt"]
+
+
+SOS_SCHEMA = (
+    (
+        "CREATE TABLE IF NOT EXISTS messages ("
+        " key TEXT PRIMARY KEY,"
+        " latitude REAL NOT NULL,"
+        " longitude REAL NOT NULL,"
+        " message TEXT NOT NULL,"
+        " received_at REAL NOT NULL)"
+    ),
+    "CREATE INDEX IF NOT EXISTS messages_position ON messages (latitude, longitude)",
+)
+
+
+def _connect(path):
+    return connect_sqlite(path, SOS_SCHEMA)
+
+
+def _parse_message(key, value):
+    try:
+        return (key, float(value["Latitude"]), float(value["Longitude"]), str(value.get("Message", "")))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+# SQLite table of SOS messages keyed by their Firebase push key. Push keys
+# sort chronologically, so the largest stored key is the resume point.
+class SosStore:
+    def __init__(self, path=None):
+        self.path = path or sos_db_path()
+
+    def last_key(self):
+        with _connect(self.path) as conn:
+            return conn.execute("SELECT MAX(key) FROM messages").fetchone()[0]
+
+    # Insert new messages and return the rows actually added
+    def insert(self, records):
+        received_at = time.time()
+        rows = [
+            parsed + (received_at,)
+            for parsed in (_parse_message(key, value) for key, value in records.items())
+            if parsed
+        ]
+        added = []
+        with _connect(self.path) as conn:
+            for row in rows:
+                cursor = conn.execute("INSERT OR IGNORE INTO messages VALUES (?, ?, ?, ?, ?)", row)
+                if cursor.rowcount:
+                    added.append(row)
+        return added
+
+    def frame(self):
+        with _connect(self.path) as conn:
+            rows = conn.execute("SELECT * FROM messages ORDER BY key").fetchall()
+        return pd.DataFrame(rows, columns=SOS_COLUMNS)
+
+
+# Pulls only the messages after the last stored key on each poll and keeps an
+# in-memory DataFrame of all messages, plus a spatial index over them, that
+# are appended to rather than rebuilt.
+class SosIngest:
+    def __init__(self, reference, store=None, batch_size=POLL_BATCH_SIZE):
+        self.reference = reference
+        self.store = store or SosStore()
+        self.batch_size = batch_size
+        self.index = SpatialIndex()
+        self._frame = None
+        self._lock = threading.Lock()
+
+    def poll(self):
+        added = []
+        last_key = self.store.last_key()
+        while True:
+            query = self.reference.order_by_key()
+            if last_key is not None:
+                query = query.start_at(last_key)
+            # start_at is inclusive, so ask for one extra row to cover last_key
+            records = query.limit_to_first(self.batch_size + 1).get() or {}
+            records.pop(last_key, None)
+            if not records:
+                return added
+            added.extend(self.store.insert(records))
+            last_key = max(records)
+            if len(records) < self.batch_size:
+                return added
+
+    # All messages, after pulling the new ones
+    def refresh(self):
+        with self._lock:
+            added = self.poll()
+            if self._frame is None:
+                self._frame = self.store.frame()
+                self.index.add_many(self._frame["Key"], self._frame["Latitude"], self._frame["Longitude"])
+            elif added:
+                new_rows = pd.DataFrame(added, columns=SOS_COLUMNS)
+                self._frame = pd.concat([self._frame, new_rows], ignore_index=True)
+                self.index.add_many(new_rows["Key"], new_rows["Latitude"], new_rows["Longitude"])
+            return self._frame
+
+
+# Cheap snapshot version: message count plus the newest key
+def sos_version(frame):
+    if frame.empty:
+        return "empty"
+    return f"{len(frame)}:{frame['Key'].iloc[-1]}"
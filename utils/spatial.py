@@ -0,0 +1,155 @@
+import math
+import threading
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Default grid cell edge in degrees (~11 km at the equator)
+DEFAULT_CELL_DEGREES = 0.1
+
+
+def haversine_km(lat, lon, lats, lons):
+    lat, lon, lats, lons = map(np.radians, (lat, lon, lats, lons))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+# Grid-bucket (geohash-style) index over points. Coordinates live in growable
+# NumPy arrays and each fixed-size lat/lon cell keeps the positions of the
+# points inside it, so points can be added one at a time as they arrive and a
+# query only looks at the cells it overlaps.
+class SpatialIndex:
+    def __init__(self, cell_degrees=DEFAULT_CELL_DEGREES):
+        self.cell = cell_degrees
+        self.rows = int(math.ceil(180 / cell_degrees))
+        self.cols = int(math.ceil(360 / cell_degrees))
+        self.keys = []
+        self._lats = np.empty(1024)
+        self._lons = np.empty(1024)
+        self._cells = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _cell_of(self, lat, lon):
+        row = min(int((lat + 90) // self.cell), self.rows - 1)
+        col = int((lon + 180) // self.cell) % self.cols
+        return row, col
+
+    def add(self, key, lat, lon):
+        with self._lock:
+            i = len(self.keys)
+            if i == len(self._lats):
+                self._lats = np.resize(self._lats, 2 * i)
+                self._lons = np.resize(self._lons, 2 * i)
+            self._lats[i] = lat
+            self._lons[i] = lon
+            self.keys.append(key)
+            self._cells.setdefault(self._cell_of(lat, lon), []).append(i)
+
+    def add_many(self, keys, lats, lons):
+        for key, lat, lon in zip(keys, lats, lons):
+            self.add(key, lat, lon)
+
+    def _candidates(self, rows, cols):
+        found = [self._cells[(row, col)] for row in rows for col in cols if (row, col) in self._cells]
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.fromiter((i for cell in found for i in cell), dtype=np.int64)
+
+    def _col_range(self, west, east):
+        first = int((west + 180) // self.cell) % self.cols
+        last = int((east + 180) // self.cell) % self.cols
+        if west <= east and east - west >= 360 - self.cell:
+            return range(self.cols)
+        if first <= last and west <= east:
+            return range(first, last + 1)
+        # Box crosses the antimeridian
+        return list(range(first, self.cols)) + list(range(0, last + 1))
+
+    def _row_range(self, south, north):
+        first = max(int((south + 90) // self.cell), 0)
+        last = min(int((north + 90) // self.cell), self.rows - 1)
+        return range(first, last + 1)
+
+    # Keys of the points inside a bounding box; west > east means the box
+    # crosses the antimeridian
+    def bbox(self, south, west, north, east):
+        with self._lock:
+            idx = self._candidates(self._row_range(south, north), self._col_range(west, east))
+            lats, lons = self._lats[idx], self._lons[idx]
+            inside = (lats >= south) & (lats <= north)
+            if west <= east:
+                inside &= (lons >= west) & (lons <= east)
+            else:
+                inside &= (lons >= west) | (lons <= east)
+            return [self.keys[i] for i in idx[inside]]
+
+    # (key, distance_km) for points within radius_km, nearest first
+    def radius(self, lat, lon, radius_km):
+        with self._lock:
+            dlat = radius_km / KM_PER_DEGREE
+            south, north = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+            if south <= -90.0 or north >= 90.0:
+                west, east = -180.0, 180.0
+            else:
+                dlon = dlat / max(math.cos(math.radians(max(abs(south), abs(north)))), 1e-6)
+                west, east = lon - dlon, lon + dlon
+                if dlon >= 180:
+                    west, east = -180.0, 180.0
+                else:
+                    west = (west + 180) % 360 - 180
+                    east = (east + 180) % 360 - 180
+            idx = self._candidates(self._row_range(south, north), self._col_range(west, east))
+            distances = haversine_km(lat, lon, self._lats[idx], self._lons[idx])
+            keep = distances <= radius_km
+            idx, distances = idx[keep], distances[keep]
+            order = np.argsort(distances, kind="stable")
+            return [(self.keys[i], float(d)) for i, d in zip(idx[order], distances[order])]
+
+    # k nearest points as (key, distance_km), searching rings of cells outward
+    # until no unvisited cell can hold anything closer than the current k-th
+    def nearest(self, lat, lon, k=1):
+        with self._lock:
+            if not self.keys:
+                return []
+            k = min(k, len(self.keys))
+            center_row, center_col = self._cell_of(lat, lon)
+            max_ring = max(self.rows, self.cols // 2)
+            seen = []
+            for ring in range(max_ring + 1):
+                # Once the rings cover more cells than are occupied, scanning
+                # every point is cheaper than walking empty cells
+                if (2 * ring + 1) ** 2 > 4 * len(self._cells):
+                    return self._nearest_scan(lat, lon, k)
+                rows = range(max(center_row - ring, 0), min(center_row + ring, self.rows - 1) + 1)
+                ring_cells = [
+                    (row, (center_col + dc) % self.cols)
+                    for row in rows
+                    for dc in range(-ring, ring + 1)
+                    if abs(row - center_row) == ring or abs(dc) == ring
+                ]
+                seen.extend(self._cells.get(cell, ()) for cell in ring_cells)
+                count = sum(len(cell) for cell in seen)
+                if count < k:
+                    continue
+                idx = np.fromiter((i for cell in seen for i in cell), dtype=np.int64, count=count)
+                distances = haversine_km(lat, lon, self._lats[idx], self._lons[idx])
+                kth = np.partition(distances, k - 1)[k - 1]
+                # Anything outside the searched rings is at least `ring` cells away
+                edge_lat = min(abs(lat) + (ring + 1) * self.cell, 90.0)
+                bound = ring * self.cell * KM_PER_DEGREE * max(math.cos(math.radians(edge_lat)), 0.0)
+                if kth <= bound:
+                    order = np.argsort(distances, kind="stable")[:k]
+                    return [(self.keys[idx[i]], float(distances[i])) for i in order]
+            return self._nearest_scan(lat, lon, k)
+
+    def _nearest_scan(self, lat, lon, k):
+        n = len(self.keys)
+        distances = haversine_km(lat, lon, self._lats[:n], self._lons[:n])
+        nearest = np.argpartition(distances, k - 1)[:k] if k < n else np.arange(n)
+        order = nearest[np.argsort(distances[nearest], kind="stable")]
+        return [(self.keys[i], float(distances[i])) for i in order]
@@ -0,0 +1,64 @@
+import re
+from html import unescape
+
+# Elements whose content is never visible text
+SKIPPED_TAGS = frozenset({"script", "style", "noscript", "template", "head", "svg"})
+
+# Elements that start a new line of text, so "<p>a</p><p>b</p>" reads "a b"
+BLOCK_TAGS = frozenset({
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "figcaption",
+    "figure", "footer", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav",
+    "ol", "p", "pre", "section", "table", "td", "th", "tr", "ul",
+})
+
+# One token per tag, comment, doctype or processing instruction. "[^<>]" stops
+# a failed match at the next "<", so text full of stray "<" stays linear,
+# unlike the non-greedy "<.*?>" that rescans to the end from every "<". An
+# unclosed comment swallows the rest of the input.
+TAG = re.compile(r"<!--.*?(?:-->|$)|<[!?][^<>]*>|<(/?)([A-Za-z][A-Za-z0-9-]*)[^<>]*>", re.S)
+
+# NewsAPI cuts "content" at 200 characters and appends "… [+1234 chars]"
+TRUNCATION_MARKER = re.compile(r"\s*(?:…|\.\.\.)?\s*\[\+\d+ chars\]\s*$")
+WHITESPACE = re.compile(r"\s+")
+
+
+def _strip_tags(markup):
+    parts = []
+    pos = 0
+    skip_depth = 0
+    for tag in TAG.finditer(markup):
+        if not skip_depth and tag.start() > pos:
+            parts.append(markup[pos:tag.start()])
+        pos = tag.end()
+        name = tag.group(2)
+        if name is None:
+            continue
+        name = name.lower()
+        if name in SKIPPED_TAGS:
+            if tag.group(1):
+                skip_depth = max(skip_depth - 1, 0)
+            elif not tag.group(0).endswith("/>"):  # "<svg/>" has no content to skip
+                skip_depth += 1
+        elif name in BLOCK_TAGS:
+            parts.append(" ")
+    if not skip_depth:
+        parts.append(markup[pos:])
+    return "".join(parts)
+
+
+# Plain text of an HTML fragment in one pass: tags and comments removed,
+# script and style content dropped, entities decoded, the NewsAPI truncation
+# marker stripped and whitespace collapsed
+def html_to_text(markup):
+    if not markup:
+        return ""
+    text = _strip_tags(markup) if "<" in markup else markup
+    if "&" in text:
+        text = unescape(text)
+    text = TRUNCATION_MARKER.sub("", text)
+    return WHITESPACE.sub(" ", text).strip()
+
+
+# html_to_text over a batch; None and empty inputs give ""
+def html_to_text_batch(markups):
+    return [html_to_text(markup) for markup in markups]
@@ -1,86 +1,23 @@
-import requests
 import streamlit as st
-import time
-import folium
-import json
-import os
-from dotenv import load_dotenv
-from streamlit_folium import st_folium
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from datetime import datetime, timedelta
-
-load_dotenv()
-
-NEWS_API_KEY = os.getenv("NEWS_API_KEY") or st.secrets["NEWS_API_KEY"]
-
-# Function to download the latest GeoJSON file using Selenium
-@st.cache_data
-def download_geojson(url, download_dir):
-    options = webdriver.ChromeOptions()
-    prefs = {"download.default_directory": download_dir}
-    options.add_experimental_option("prefs", prefs)
-    options.add_argument("--headless")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    driver.get(url)
-    
-    # Execute the JavaScript to download the file
-    driver.execute_script("downloadResult();")
-    
-    # Wait for the download to complete
-    time.sleep(10)
-    
-    driver.quit()
-
-# Function to fetch disaster data from a GeoJSON file
-def fetch_disaster_data(filepath):
-    with open(filepath, 'r') as f:
-        data = json.load(f)
-    return data
-
-# Function to filter entries from the last 3 months
-@st.cache_data
-def filter_recent_entries(entries, months=3):
-    recent_entries = []
-    now = datetime.now()
-    cutoff_date = now - timedelta(days=months*30)  # Approximate 3 months
-    for entry in entries:
-        if 'fromdate' in entry['properties']:
-            entry_date = datetime.strptime(entry['properties']['fromdate'], '%Y-%m-%dT%H:%M:%S')
-            if entry_date >= cutoff_date:
-                recent_entries.append(entry)
-    return recent_entries
-
-def plot_disaster_events(m, disaster_data):
-    for event in disaster_data:
-        properties = event['properties']
-        geometry = event['geometry']
-        if geometry['type'] == 'Point':
-            lat, lon = geometry['coordinates'][1], geometry['coordinates'][0]
-            title = properties['eventname']
-            description = properties['description']
-            fromdate = properties['fromdate']
-            more_info_url = properties['url'].get('report', None)
-            if more_info_url:
-                popup_text = f"{title}: {description}<br>Date: {fromdate}<br><a href='{more_info_url}' target='_blank'>More Info</a>"
-            else:
-                popup_text = f"{title}: {description}<br>Date: {fromdate}"
-            folium.Marker([lat, lon], popup=popup_text).add_to(m)     
+from datetime import timedelta
+from utils.events import ALERT_LEVELS, DEFAULT_WINDOW, EVENT_TYPES, filter_events, get_event_table
+from utils.feeds import get_gdacs, latest_news, news_source, show_freshness
+from utils.maps import MAP_RENDER_MODE, cached_map_html, new_map, plot_disaster_events, show_map
+
+# Time window choices for the map, in days
+WINDOW_OPTIONS = sorted({7, 30, 90, 180, 365, DEFAULT_WINDOW.days})
+
+# Function to fetch the parsed GDACS event table, built once per feed version,
+# along with the raw features it indexes into and that version
+def fetch_event_table():
+    data, version = get_gdacs()
+    features = data.get('features', [])
+    return get_event_table(version, features), features, version
 
 # Function to get latest news about California fires
 
-@st.cache_data
 def get_latest_news(query):
-    url = f"https://newsapi.org/v2/everything?q={query}&apiKey={NEWS_API_KEY}"
-    response = requests.get(url)
-    news_data = response.json()
-    return news_data['articles']
+    return latest_news(query)
       
 
 
@@ -90,24 +27,35 @@ def get_latest_news(query):
 st.title("🗺️ Global Disaster Affected Areas")
 st.markdown("---")
 
-m = folium.Map(location=[20.0, 0.0], zoom_start=2)
-
-# Download the latest GeoJSON file if it doesn't exist
-geojson_url = "https://www.gdacs.org/Alerts/default.aspx"
-download_dir = os.getcwd()  # Current working directory
-geojson_filepath = os.path.join(download_dir, "result.geojson")
-if not os.path.exists(geojson_filepath):
-    download_geojson(geojson_url, download_dir)
-
-# Fetch disaster data from GeoJSON file
-disaster_data = fetch_disaster_data(geojson_filepath)
-if 'features' in disaster_data:
-    recent_disaster_data = filter_recent_entries(disaster_data['features'])
-    plot_disaster_events(m, recent_disaster_data)    
+# Fetch the GDACS event table from the background snapshot
+events, features, version = fetch_event_table()
+show_freshness("gdacs")
+if not events.empty:
+    filter_col1, filter_col2, filter_col3 = st.columns(3)
+    window_days = filter_col1.selectbox(
+        "Time window", WINDOW_OPTIONS,
+        index=WINDOW_OPTIONS.index(DEFAULT_WINDOW.days),
+        format_func=lambda days: f"Last {days} days"
+    )
+    event_types = filter_col2.multiselect(
+        "Event types", sorted(events['eventtype'].dropna().unique()),
+        format_func=lambda code: EVENT_TYPES.get(code, code)
+    )
+    alert_levels = filter_col3.multiselect("Alert levels", ALERT_LEVELS)
+
+    recent_events = filter_events(events, window=timedelta(days=window_days), event_types=event_types, alert_levels=alert_levels)
+    st.caption(f"Showing {len(recent_events)} of {len(events)} GDACS events")
+
+    # Build the map only when the GDACS version or the selected layers change
+    def build_map():
+        m = new_map("world")
+        plot_disaster_events(m, recent_events, features)
+        return m
+
+    layers = ("events", MAP_RENDER_MODE, window_days, tuple(sorted(event_types)), tuple(sorted(alert_levels)))
+    show_map(cached_map_html(version, "world", layers, build_map), height=500)
 else:
-    st.error("No disaster events found") 
-        
-st_folium(m, width="100%", height=500 , key="affected_areas_map")
+    st.error("No disaster events found")
 
 
 
@@ -118,20 +66,21 @@ st.markdown("### 📰 Latest News About California Fires")
 st.info("Fetching and summarizing LA Wildfires news...")
 
 news_articles = get_latest_news("California fires")
+show_freshness(news_source("California fires"))
 
 if 'news_count' not in st.session_state:
     st.session_state.news_count = 3
 
 if news_articles:
     st.success("News fetched successfully!")
-    for article in news_articles[:st.session_state.news_count]:
+    for article in news_articles.head(st.session_state.news_count):
         title = article['title']
         description = article['description']
         url = article['url']
         st.markdown(f"- [{title}]({url})")
         st.write(description)
 
-    if len(news_articles) > st.session_state.news_count:
+    if news_articles.has_more(st.session_state.news_count):
         if st.button("See more"):
             st.session_state.news_count += 3
             st.rerun()
@@ -152,14 +101,14 @@ if 'query' in st.session_state and 'more_news_articles' in st.session_state:
     more_news_articles = st.session_state.more_news_articles
     if more_news_articles:
         st.success("News fetched successfully!")
-        for article in more_news_articles[:st.session_state.more_news_count]:
+        for article in more_news_articles.head(st.session_state.more_news_count):
             title = article['title']
             description = article['description']
             url = article['url']
             st.markdown(f"- [{title}]({url})")
             st.write(description)
 
-        if len(more_news_articles) > st.session_state.more_news_count:
+        if more_news_articles.has_more(st.session_state.more_news_count):
             if st.button("See more", key="more_news"):
                 st.session_state.more_news_count += 3
                 st.rerun()
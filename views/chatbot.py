@@ -4,46 +4,113 @@ st.title("🤖 Resilio Chatbot: ")
 st.subheader("A Personal Assistant for Disaster Relief")
 st.markdown("---")
 
-from huggingface_hub import InferenceClient
-import os
-import tempfile
-from langchain_community.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.embeddings import HuggingFaceHubEmbeddings
-from langchain.vectorstores import FAISS
-from langchain.chains import RetrievalQA
-from langchain.llms import HuggingFaceEndpoint 
+from utils.chat_memory import ConversationMemory
+from utils.corpus import get_corpus
+from utils.ingest import document_id, ingest_pdf
+from utils.llm import StreamTiming, get_latency_stats, stream_chat
+from utils.rag import get_rag_chain
+from utils.response_cache import get_response_cache, response_scope
 
 
 
-# Load environment variables
-HF_TOKEN = os.getenv('HF_TOKEN') or st.secrets["HF_TOKEN"]
-
 # Initialize Streamlit app
 
-# Sidebar for document upload
+# Shared knowledge base; documents added here are searchable from every session
+corpus = get_corpus()
+response_cache = get_response_cache()
+
+# Sidebar for the knowledge base
 with st.sidebar:
     st.header("RAG Functionality")
-    uploaded_file = st.file_uploader("Upload a document (PDF only)", type=["pdf"])
-
-# Initialize document processing variables
+    uploaded_files = st.file_uploader(
+        "Add documents to the knowledge base (PDF only)", type=["pdf"], accept_multiple_files=True
+    )
+
+# Each upload is indexed once per session under an id derived from its name
+# and content, so identical content costs nothing and unrelated files with the
+# same name never overwrite each other. Another version of a document already
+# in the knowledge base is only replaced when the user confirms it.
+if "ingested" not in st.session_state:
+    st.session_state.ingested = set()
+if "replace_documents" not in st.session_state:
+    st.session_state.replace_documents = {}
+for uploaded_file in uploaded_files or []:
+    data = uploaded_file.getvalue()
+    doc_id = document_id(uploaded_file.name, data)
+    if doc_id in st.session_state.ingested:
+        continue
+    existing = {doc["doc_id"]: doc for doc in corpus.documents()}
+    others = [other for other, doc in existing.items() if doc["name"] == uploaded_file.name and other != doc_id]
+    replace = st.session_state.replace_documents.get(doc_id)
+    with st.sidebar:
+        if others and replace is None and doc_id not in existing:
+            st.warning(f"The knowledge base already has a different {uploaded_file.name}.")
+            col1, col2 = st.columns(2)
+            if col1.button("Replace it", key=f"replace-{doc_id}"):
+                st.session_state.replace_documents[doc_id] = True
+                st.rerun()
+            if col2.button("Keep both", key=f"keep-{doc_id}"):
+                st.session_state.replace_documents[doc_id] = False
+                st.rerun()
+            continue
+
+        progress_bar = st.progress(0.0, text=f"Indexing {uploaded_file.name}...")
+        result = ingest_pdf(
+            corpus, doc_id, uploaded_file.name, data,
+            progress=lambda done, total: progress_bar.progress(
+                done / total, text=f"Indexing {uploaded_file.name}: page {done} of {total}"
+            ),
+            replaces=others if replace else ()
+        )
+        progress_bar.empty()
+        if result["added"] or result["kept"]:
+            st.success(f"{uploaded_file.name}: {result['added']} chunks indexed, {result['kept']} unchanged")
+        else:
+            st.error(f"No text could be extracted from {uploaded_file.name}.")
+    st.session_state.ingested.add(doc_id)
+
+# Documents to answer from, chosen per session and applied at query time
 documents = None
-vector_store = None
-if uploaded_file:
-    with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-        temp_file.write(uploaded_file.read())
-        temp_file_path = temp_file.name
-
-    loader = PyPDFLoader(temp_file_path)
-
-    documents = loader.load()
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    texts = text_splitter.split_documents(documents)
-
-    embeddings = HuggingFaceHubEmbeddings(huggingfacehub_api_token=HF_TOKEN)
-    vector_store = FAISS.from_documents(texts, embeddings)
-
-    st.sidebar.success("Document uploaded and processed successfully!")
+with st.sidebar:
+    corpus_documents = corpus.documents()
+    if corpus_documents:
+        # Documents kept under the same name are told apart by their content hash
+        name_counts = {}
+        for doc in corpus_documents:
+            name_counts[doc["name"]] = name_counts.get(doc["name"], 0) + 1
+        names = {
+            doc["doc_id"]: doc["name"] if name_counts[doc["name"]] == 1 else f"{doc['name']} ({doc['content_hash'][:8]})"
+            for doc in corpus_documents
+        }
+        selected = st.multiselect(
+            "Answer from", list(names), default=list(names), format_func=names.get
+        )
+        if selected:
+            documents = selected
+        with st.expander("Manage knowledge base"):
+            for doc in corpus_documents:
+                col1, col2 = st.columns([3, 1])
+                col1.write(f"{names[doc['doc_id']]} ({doc['chunks']} chunks)")
+                if col2.button("Remove", key=f"remove-{doc['doc_id']}"):
+                    corpus.remove_document(doc["doc_id"])
+                    st.rerun()
+
+# Response latency and cache savings across all sessions of this server
+with st.sidebar:
+    latency = get_latency_stats().summary()
+    if latency:
+        with st.expander("Response latency"):
+            cache_stats = response_cache.stats()
+            st.write(
+                f"**cache**: {cache_stats['hit_rate']:.0%} hit rate ({cache_stats['hits']} hits), "
+                f"{cache_stats['saved_seconds']:.1f}s of generation saved"
+            )
+            for kind, stats in latency.items():
+                ttft = f"{stats['ttft_p50']:.2f}s" if stats["ttft_p50"] is not None else "n/a"
+                st.write(
+                    f"**{kind}** ({stats['requests']} answers): first token p50 {ttft}, "
+                    f"full answer p50 {stats['total_p50']:.2f}s / p95 {stats['total_p95']:.2f}s"
+                )
 
 # Initialize chat history
 if "messages" not in st.session_state:
@@ -52,6 +119,10 @@ if "messages" not in st.session_state:
         {"role": "assistant", "content": "Hello 👋 Hope you are doing well. How may I assist you today?"}
     ]
 
+# What of the history is sent each turn, kept within CHAT_TOKEN_BUDGET
+if "memory" not in st.session_state:
+    st.session_state.memory = ConversationMemory()
+
 # Display chat messages
 for message in st.session_state.messages:
     if message["role"] != "system":
@@ -67,43 +138,43 @@ if prompt := st.chat_input():
     # Generate response
     with st.chat_message("assistant"):
         with st.spinner("Thinking..."):
-            if documents is None:
-                # No document uploaded - basic response
-                client = InferenceClient(api_key=HF_TOKEN)
-
-                stream = client.chat.completions.create(
-                    model="meta-llama/Llama-3.2-1B-Instruct",
-                    messages=st.session_state.messages,
-                    max_tokens=512,
-                    temperature=0.01,
-                    top_p=0.9,
-                    stream=True
-                )
-
-                placeholder = st.empty()
-                full_response = ''
-                for chunk in stream:
-                    if chunk.choices and chunk.choices[0].delta.content:
-                        full_response += chunk.choices[0].delta.content
-                        placeholder.markdown(full_response)
-
-                if full_response.strip():
-                    st.session_state.messages.append({"role": "assistant", "content": full_response})
+            timing = StreamTiming()
+            sources = []
+            # RAG answers depend only on the question and the documents; plain
+            # answers also on the conversation, so only an opening question is
+            # answered from the shared cache
+            if documents is not None:
+                scope = response_scope(corpus.version, documents)
+            elif sum(message["role"] == "user" for message in st.session_state.messages) == 1:
+                scope = response_scope()
             else:
-                # Document uploaded - RAG-based response
-                qa_chain = RetrievalQA.from_chain_type(
-                    llm=HuggingFaceEndpoint(
-                        repo_id="meta-llama/Llama-3.2-1B-Instruct",
-                        max_length=512,
-                        temperature=0.01,
-                        top_p=0.9,
-                        huggingfacehub_api_token=HF_TOKEN,
-                    ),
-                    chain_type="stuff",
-                    retriever=vector_store.as_retriever()
-                )
+                scope = None
+            cached = response_cache.lookup(prompt, scope) if scope else None
+
+            if cached:
+                sources, stream = cached.sources, [cached.answer]
+            elif documents is None:
+                # No document selected - basic response
+                stream = stream_chat(st.session_state.memory.prompt(st.session_state.messages), timing=timing)
+            else:
+                # Documents selected - RAG-based response over them
+                sources, stream = get_rag_chain().stream(prompt, doc_ids=documents, timing=timing)
+
+            placeholder = st.empty()
+            full_response = ''
+            for token in stream:
+                full_response += token
+                placeholder.markdown(full_response)
 
-                response = qa_chain({"query": prompt})
-                full_response = response["result"]
-                st.write(full_response)
+            if full_response.strip():
                 st.session_state.messages.append({"role": "assistant", "content": full_response})
+                if scope and not cached:
+                    response_cache.store(prompt, scope, full_response, timing.total, sources)
+            if cached:
+                st.caption(f"Answered from cache (same as: \"{cached.question}\")")
+            if sources:
+                with st.expander("Sources"):
+                    for chunk in sources:
+                        st.caption(f"{chunk['name']}, page {chunk['metadata'].get('page', 0) + 1}")
+            if not cached and timing.ttft is not None:
+                st.caption(f"First token after {timing.ttft:.2f}s, full answer after {timing.total:.2f}s")
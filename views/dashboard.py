@@ -1,137 +1,37 @@
-import os
-import re
-import time
-import json
-from dotenv import load_dotenv
-import requests
 import streamlit as st
 import plotly.graph_objects as go
-import folium
-from streamlit_folium import st_folium
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from datetime import datetime, timedelta
-from ibmcloudant.cloudant_v1 import CloudantV1
-from ibm_cloud_sdk_core.authenticators import IAMAuthenticator
-from ibm_watson import NaturalLanguageUnderstandingV1
-from ibm_watson.natural_language_understanding_v1 import Features, KeywordsOptions
-
-load_dotenv()
-
-
-
-# IBM Cloudant Credentials
-CLOUDANT_API_KEY = os.environ.get("CLOUDANT_API_KEY") or st.secrets["CLOUDANT_API_KEY"]
-CLOUDANT_URL = os.environ.get("CLOUDANT_URL") or st.secrets["CLOUDANT_URL"]
-CLOUDANT_DB_NAME = os.environ.get("CLOUDANT_DB_NAME") or st.secrets["CLOUDANT_DB_NAME"]
-authenticator = IAMAuthenticator(CLOUDANT_API_KEY)
-client = CloudantV1(authenticator=authenticator)
-client.set_service_url(CLOUDANT_URL)
-
-
-# IBM Watson NLU Credentials
-NLU_API_KEY = os.environ.get("NLU_API_KEY") or st.secrets["NLU_API_KEY"]
-NLU_URL = os.environ.get("NLU_URL") or st.secrets["NLU_URL"]
-
-# Fetch real-time data using News API
-NEWS_API_KEY = os.environ.get("NEWS_API_KEY") or st.secrets["NEWS_API_KEY"]
-
-# Function to download the latest GeoJSON file using Selenium
-def download_geojson(url, download_dir):
-    options = webdriver.ChromeOptions()
-    prefs = {"download.default_directory": download_dir}
-    options.add_experimental_option("prefs", prefs)
-    options.add_argument("--headless")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    driver.get(url)
-    
-    # Execute the JavaScript to download the file
-    driver.execute_script("downloadResult();")
-    
-    # Wait for the download to complete
-    time.sleep(10)
-    
-    driver.quit()
-
-# Function to fetch disaster data from a GeoJSON file
-def fetch_disaster_data(filepath):
-    with open(filepath, 'r') as f:
-        data = json.load(f)
-    return data
-
-# Function to filter entries from the last 3 months
-def filter_recent_entries(entries, months=3):
-    recent_entries = []
-    now = datetime.now()
-    cutoff_date = now - timedelta(days=months*30)  # Approximate 3 months
-    for entry in entries:
-        if 'fromdate' in entry['properties']:
-            entry_date = datetime.strptime(entry['properties']['fromdate'], '%Y-%m-%dT%H:%M:%S')
-            if entry_date >= cutoff_date:
-                recent_entries.append(entry)
-    return recent_entries
-
-def plot_disaster_events(m, disaster_data):
-    for event in disaster_data:
-        properties = event['properties']
-        geometry = event['geometry']
-        if geometry['type'] == 'Point':
-            lat, lon = geometry['coordinates'][1], geometry['coordinates'][0]
-            title = properties['eventname']
-            description = properties['description']
-            fromdate = properties['fromdate']
-            more_info_url = properties['url'].get('report', None)
-            if more_info_url:
-                popup_text = f"{title}: {description}<br>Date: {fromdate}<br><a href='{more_info_url}' target='_blank'>More Info</a>"
-            else:
-                popup_text = f"{title}: {description}<br>Date: {fromdate}"
-            folium.Marker([lat, lon], popup=popup_text).add_to(m)     
+from utils.donations import format_usd
+from utils.events import filter_events, get_event_table
+from utils.feeds import get_gdacs, get_snapshot, latest_news, news_source, show_freshness
+from utils.keywords import get_keyword_backend
+from utils.maps import MAP_RENDER_MODE, cached_map_html, new_map, plot_disaster_events, show_map
+from utils.news import NEWS_PAGE_SIZE
+from utils.text import html_to_text_batch
+
+
+# Function to fetch the parsed GDACS event table, built once per feed version,
+# along with the raw features it indexes into and that version
+def fetch_event_table():
+    data, version = get_gdacs()
+    features = data.get('features', [])
+    return get_event_table(version, features), features, version
 
 # Function to get latest news about California fires
 def get_latest_news(query):
-    url = f"https://newsapi.org/v2/everything?q={query}&apiKey={NEWS_API_KEY}"
-    response = requests.get(url)
-    news_data = response.json()
-    return news_data['articles']
+    return latest_news(query)
 
-@st.cache_data
 def fetch_web_data(query):
-    url = f"https://newsapi.org/v2/everything?q={query}&apiKey={NEWS_API_KEY}"
-    response = requests.get(url)
-    articles = response.json().get("articles", [])
+    articles = latest_news(query).head(NEWS_PAGE_SIZE)
     return [(article["title"], article["content"]) for article in articles if article.get("content")]
 
-# Initialize IBM Watson NLU client
-nlu_authenticator = IAMAuthenticator(NLU_API_KEY)
-nlu = NaturalLanguageUnderstandingV1(
-    version="2021-08-01",
-    authenticator=nlu_authenticator
-)
-nlu.set_service_url(NLU_URL)
-
-# Function to create a donation pie chart
-@st.cache_data
+# Function to read the donation totals kept up to date by the background refresher
 def fetch_donations():
-    try:
-        response = client.post_all_docs(
-            db=CLOUDANT_DB_NAME,
-            include_docs=True
-        ).get_result()
-        return [doc["doc"] for doc in response["rows"]]
-    except Exception as e:
-        st.error(f"Error fetching donation data: {e}")
-        return []
+    return get_snapshot("donations").data or {"total": 0, "count": 0, "top_donor": None, "by_day": {}}
 
 
 # Calculate the total donation amount
 def calculate_total_donations(donations):
-    return sum(donation["amount"] for donation in donations if "amount" in donation)
+    return donations["total"]
 
 
 # Create a pie chart for donation progress
@@ -154,30 +54,18 @@ def create_donation_pie_chart(total_donations, goal_amount):
     return fig
 
 
-def clean_html(text):
-    clean = re.compile("<.*?>")
-    return re.sub(clean, "", text)
-
-# Function to analyze text and extract keywords
-@st.cache_data
-def analyze_summary(title, text):
-    try:
-        response = nlu.analyze(
-            text=text,
-            features=Features(
-                keywords=KeywordsOptions(emotion=False, sentiment=False, limit=5)
-            )
-        ).get_result()
-
-        keywords = [keyword["text"] for keyword in response["keywords"]]
-
-        # Constructing a summary from title and extracted keywords
-        summary = f"**{title}**\n\n**Key Topics**: {', '.join(keywords)}"
-
-        return summary
-    except Exception as e:
-        st.error(f"Error analyzing summary: {e}")
-        return None
+# Function to analyze a batch of articles and extract keywords with the
+# configured backend (KEYWORD_BACKEND: local, watson or tiered)
+def analyze_summaries(articles):
+    results = get_keyword_backend().extract([text for _, text in articles])
+    summaries = []
+    for (title, _), keywords in zip(articles, results):
+        if isinstance(keywords, Exception):
+            summaries.append((None, f"Error analyzing summary: {keywords}"))
+        else:
+            # Constructing a summary from title and extracted keywords
+            summaries.append((f"**{title}**\n\n**Key Topics**: {', '.join(keywords)}", None))
+    return summaries
 
 
 # --------------------------------------------------------------------------------------------------------------
@@ -192,24 +80,21 @@ col3, col4 = st.columns([1, 1])  # Bottom row
 
 # Section 1: Affected Areas (Top Left)
 with col1:
-    st.header("🌍 Affected Areas")    
-    m = folium.Map(location=[37.0902, -100.7129], zoom_start=3.5)
-
-    # Download the latest GeoJSON file if it doesn't exist
-    geojson_url = "https://www.gdacs.org/Alerts/default.aspx"
-    download_dir = os.getcwd()  # Current working directory
-    geojson_filepath = os.path.join(download_dir, "result.geojson")
-    if not os.path.exists(geojson_filepath):
-        download_geojson(geojson_url, download_dir)
-    # Fetch disaster data from GeoJSON file
-    disaster_data = fetch_disaster_data(geojson_filepath)
-    if 'features' in disaster_data:
-        recent_disaster_data = filter_recent_entries(disaster_data['features'])
-        plot_disaster_events(m, recent_disaster_data)    
+    st.header("🌍 Affected Areas")
+
+    # Fetch the GDACS event table from the background snapshot
+    events, features, version = fetch_event_table()
+    show_freshness("gdacs")
+    if not events.empty:
+        # Build the map only when the GDACS version changes
+        def build_map():
+            m = new_map("usa")
+            plot_disaster_events(m, filter_events(events), features)
+            return m
+
+        show_map(cached_map_html(version, "usa", ("events", MAP_RENDER_MODE), build_map), height=500)
     else:
-        st.error("No disaster events found") 
-            
-    st_folium(m, width="100%", height=500, key="dashboard_map")    
+        st.error("No disaster events found")
 
     if st.button("Learn More"):
         st.switch_page("views/affected_areas.py")
@@ -221,17 +106,18 @@ with col2:
     st.header("💰Donations")
 
     donations = fetch_donations()
+    show_freshness("donations")
     total_donations = calculate_total_donations(donations)
     goal_amount = 100
 
     fig = create_donation_pie_chart(total_donations, goal_amount)
     st.plotly_chart(fig, use_container_width=True)
 
-    st.write(f"- **Total Donations Raised:** ${total_donations}")
-    st.write(f"- **Goal Amount:** ${goal_amount}")
-    st.write(f"- **Number of Donations:** {len(donations)}")
+    st.write(f"- **Total Donations Raised:** {format_usd(total_donations)}")
+    st.write(f"- **Goal Amount:** {format_usd(goal_amount)}")
+    st.write(f"- **Number of Donations:** {donations['count']}")
     st.write(f"- **Goal Achieved:** {total_donations / goal_amount:.2%}")
-    #st.write(f"- **Top Donor:** {max(donations, key=lambda x: x['amount'])['name'] if donations else 'N/A'}")
+    st.write(f"- **Top Donor:** {donations['top_donor']['name'] if donations['top_donor'] else 'N/A'}")
 
     
     
@@ -244,14 +130,16 @@ with col3:
     query = "LA Wild Fires"
     st.info("Fetching and summarizing LA Wildfires news...")
     web_data = fetch_web_data(query)
+    show_freshness(news_source(query))
 
     if web_data:
         st.success("Data fetched successfully!")
-        for i, (title, content) in enumerate(web_data[:5]):
-            cleaned_text = clean_html(content)
-            summary = analyze_summary(title, cleaned_text)
-
-            if summary:
+        titles, contents = zip(*web_data[:5])
+        articles = list(zip(titles, html_to_text_batch(contents)))
+        for i, (summary, error) in enumerate(analyze_summaries(articles)):
+            if error:
+                st.error(error)
+            elif summary:
                 st.write(f"Headline {i + 1}:")
                 st.write(f"- {summary}")
     else:
@@ -270,14 +158,14 @@ with col3:
         more_news_articles = st.session_state.more_news_articles
         if more_news_articles:
             st.success("News fetched successfully!")
-            for article in more_news_articles[:st.session_state.more_news_count]:
+            for article in more_news_articles.head(st.session_state.more_news_count):
                 title = article['title']
                 description = article['description']
                 url = article['url']
                 st.markdown(f"- [{title}]({url})")
                 st.write(description)
 
-            if len(more_news_articles) > st.session_state.more_news_count:
+            if more_news_articles.has_more(st.session_state.more_news_count):
                 if st.button("See more", key="more_news"):
                     st.session_state.more_news_count += 3
                     st.rerun()
@@ -1,16 +1,7 @@
 import streamlit as st
-import os
-from ibmcloudant.cloudant_v1 import CloudantV1
-from ibm_cloud_sdk_core.authenticators import IAMAuthenticator
-
-
-# IBM Cloudant Credentials
-CLOUDANT_API_KEY = os.environ.get("CLOUDANT_API_KEY") or st.secrets["CLOUDANT_API_KEY"]
-CLOUDANT_URL = os.environ.get("CLOUDANT_URL") or st.secrets["CLOUDANT_URL"]
-CLOUDANT_DB_NAME = os.environ.get("CLOUDANT_DB_NAME") or st.secrets["CLOUDANT_DB_NAME"]
-authenticator = IAMAuthenticator(CLOUDANT_API_KEY)
-client = CloudantV1(authenticator=authenticator)
-client.set_service_url(CLOUDANT_URL)
+from utils.donations import format_usd
+from utils.donation_queue import build_donation, enqueue_donation, pending_count
+from utils.feeds import get_refresher, get_snapshot, show_freshness
 
 
 # --------------------------------------------------------------------------------------------------------------
@@ -26,17 +17,32 @@ amount = st.number_input("Donation Amount (USD)", min_value=1)
 comment = st.text_area("Your Message (Optional)")
 
 if st.button("Donate"):
-    if name and email and amount > 0:
+    try:
+        donation = build_donation(name, email, amount, comment)
+    except ValueError as e:
+        st.error(str(e))
+    else:
         try:
-            donation_document = {
-                "name": name,
-                "email": email,
-                "amount": amount,
-                "comment": comment
-            }
-            client.post_document(db=CLOUDANT_DB_NAME, document=donation_document)
-            st.success(f"Thank you, {name}! Your donation of ${amount} has been recorded.")
+            # Saved locally first; the background worker sends it to Cloudant in batches
+            enqueue_donation(donation)
+            get_refresher().refresh_now("donation_queue")
+            st.success(f"Thank you, {donation['name']}! Your donation of {format_usd(donation['amount'])} has been recorded.")
         except Exception as e:
             st.error(f"Error saving donation: {e}")
-    else:
-        st.error("Please fill in all required fields.")
\ No newline at end of file
+
+queued = pending_count()
+if queued:
+    st.caption(f"{queued} donation(s) waiting to be synced to the donation database.")
+
+# Top donations, kept warm by the background refresher
+st.subheader("Top Donations")
+top = get_snapshot("top_donations").data
+show_freshness("top_donations")
+if top:
+    st.dataframe(
+        [
+            {"Name": doc.get("name") or "Anonymous", "Amount": format_usd(doc.get("amount")), "Date": (doc.get("created_at") or "")[:10]}
+            for doc in top
+        ],
+        use_container_width=True
+    )
@@ -1,38 +1,16 @@
 import streamlit as st
-import time
-import firebase_admin
-from firebase_admin import db, credentials
 import pandas as pd
 import folium
-from streamlit_folium import st_folium
+from utils.feeds import get_refresher, get_snapshot, get_sos_index, show_freshness
+from utils.maps import cached_map_html, show_map
 
-if not firebase_admin._apps:
-
-    cred = credentials.Certificate('firebase_credentials.json') or st.secrets["firebase"]['fb_credentials']
-    
-    firebase_admin.initialize_app(cred, {"databaseURL": "https://disaster-resilience-sos123-default-rtdb.firebaseio.com/"})
-
-# Function to fetch SOS messages from Firebase Realtime Database
-@st.cache_data()
+# Function to read every SOS message, with its version, from one read of the
+# snapshot kept by the background refresher
 def fetch_sos_data():
-    ref = db.reference("SOSMessages")
-    data = ref.get()
-    if data:  # Check if data exists
-        records = []
-        count = 0
-        for key, value in data.items():
-            if count < 2:
-            # Extract and store the relevant fields in a list of dictionaries
-                records.append({
-                    "Latitude": float(value["Latitude"]),
-                    "Longitude": float(value["Longitude"]),
-                    "Message": value["Message"],
-                })
-                count += 1
-            else:
-                break
-        return pd.DataFrame(records)  # Convert the list of dictionaries to a DataFrame
-    return pd.DataFrame(columns=["Latitude", "Longitude", "Message"])  # Return an empty DataFrame if no data
+    snapshot = get_snapshot("sos")
+    if snapshot.data is not None:
+        return snapshot.data, snapshot.version
+    return pd.DataFrame(columns=["Latitude", "Longitude", "Message"]), None  # Return an empty DataFrame if no data
 
 
 def plot_map(data):
@@ -40,16 +18,29 @@ def plot_map(data):
     m = folium.Map(location=[data["Latitude"].mean(), data["Longitude"].mean()], zoom_start=8)
 
     # Add markers for each SOS message
-    for _, row in data.iterrows():
+    for lat, lon, message in zip(data["Latitude"], data["Longitude"], data["Message"]):
         folium.Marker(
-            location=[row["Latitude"], row["Longitude"]],
-            popup=f"Message: {row['Message']}",
+            location=[lat, lon],
+            popup=f"Message: {message}",
             icon=folium.Icon(color="red", icon="info-sign")
         ).add_to(m)
 
     return m
 
 
+# Function to look up SOS messages by key and attach their distance from the query point.
+# The spatial index is updated live by the refresher, so it can return keys added after
+# `data` was read; those are left out until the next rerun picks up the newer snapshot.
+def sos_matches(data, matches):
+    columns = ["Message", "Latitude", "Longitude", "Distance (km)"]
+    if not matches:
+        return pd.DataFrame(columns=columns)
+    keys, distances = zip(*matches)
+    rows = data.set_index("Key").reindex(list(keys))[["Message", "Latitude", "Longitude"]]
+    rows["Distance (km)"] = [round(distance, 2) for distance in distances]
+    return rows.dropna(subset=["Message"]).reset_index(drop=True)[columns]
+
+
 # --------------------------------------------------------------------------------------------------------------
 # --------------------------------------------- PAGE CONFIGURATION ---------------------------------------------
 
@@ -58,21 +49,36 @@ st.subheader('Real time SOS messages from the Android Application')
 st.markdown("---")
 
 # Fetch the latest SOS data from Firebase
-sos_data = fetch_sos_data()
+sos_data, sos_version = fetch_sos_data()
+show_freshness("sos")
 
 # Check if there is any data
 if not sos_data.empty:
     st.subheader(f"Displaying {len(sos_data)} SOS Messages")
         
-    # Plot the map with the fetched SOS data
-    map_object = plot_map(sos_data)
-        
-    # Render the map in Streamlit using the streamlit_folium package
-    st_folium(map_object, width="100%", height=500)
+    # Plot the map with the fetched SOS data, rebuilt only when the SOS snapshot changes
+    map_html = cached_map_html(sos_version, "sos-center", ("sos",), lambda: plot_map(sos_data))
+    show_map(map_html, height=500)
+
+    # Radius and nearest-message search around a responder's position
+    st.subheader("Find SOS Messages Near a Location")
+    search_col1, search_col2, search_col3, search_col4 = st.columns(4)
+    search_lat = search_col1.number_input("Latitude", value=float(sos_data["Latitude"].mean()), format="%.5f")
+    search_lon = search_col2.number_input("Longitude", value=float(sos_data["Longitude"].mean()), format="%.5f")
+    radius_km = search_col3.number_input("Radius (km)", min_value=0.1, value=5.0)
+    nearest_count = search_col4.number_input("Nearest", min_value=1, value=5)
+
+    sos_index = get_sos_index()
+    within = sos_index.radius(search_lat, search_lon, radius_km)
+    st.write(f"**{len(within)} SOS messages within {radius_km:g} km**")
+    st.dataframe(sos_matches(sos_data, within), use_container_width=True)
+    st.write(f"**{int(nearest_count)} nearest SOS messages**")
+    st.dataframe(sos_matches(sos_data, sos_index.nearest(search_lat, search_lon, int(nearest_count))), use_container_width=True)
 else:
     st.warning("No SOS Messages to display")
 
 if st.button("Refresh Data"):
+    get_refresher().refresh_now("sos")
     st.rerun()
 
 